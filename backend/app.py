@@ -1,11 +1,16 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
-from models import db
+from models import db, upgrade_schema
 from config import Config
 from auth import auth_bp
 from interview import interview_bp
 from flask_cors import CORS
+from utils.cache import r
+from utils.cache_backend import check_cache_health
+from utils.warmup import preload, warmup, readiness
+from utils.metrics import init_metrics, render_prometheus
+from utils.recorder import init_recorder
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -24,9 +29,50 @@ jwt = JWTManager(app)
 
 app.register_blueprint(auth_bp, url_prefix="/api/auth")
 app.register_blueprint(interview_bp, url_prefix="/api/interview")
+init_metrics(app)
+init_recorder(app)
+
+
+def init_db():
+    """Create missing tables, columns and indexes. Run once per deploy, not per worker."""
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        # Don't hand pooled connections to forked workers
+        db.engine.dispose()
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    init_db()
+    print("✅ Schema up to date")
+
+
+# ===== Health =====
+@app.route("/health", methods=["GET"])
+def health():
+    """Liveness: the process is up and serving."""
+    return jsonify({"status": "ok"}), 200
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness: models are warm and the cache answers."""
+    state = readiness()
+    cache_ok, cache_ms = check_cache_health(r)
+    state.update(cache=cache_ok, cache_ms=round(cache_ms, 1))
+    status = 200 if state["ready"] and cache_ok else 503
+    return jsonify(state), status
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms for all workers."""
+    return render_prometheus(r), 200, {"Content-Type": "text/plain; version=0.0.4"}
 
-with app.app_context():
-    db.create_all()
 
 if __name__ == "__main__":
+    init_db()
+    preload()
+    warmup()
     app.run(debug=True)
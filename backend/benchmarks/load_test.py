@@ -0,0 +1,437 @@
+# End-to-end load test with stubbed external services.
+#
+#   python benchmarks/load_test.py --candidates 50
+#   python benchmarks/load_test.py --candidates 200 --concurrency 50 --gemini-latency-ms 1200 --gemini-429-rate 0.05
+#   python benchmarks/load_test.py --server gunicorn --workers 4 --cache-backend redis
+#   python benchmarks/load_test.py --target http://staging:5000 --no-fakes   # drive an existing deployment
+#
+# Starts a fake Gemini server (configurable latency, jitter and 429 rate) and
+# the backend with TTS_BACKEND=stub, STT_BACKEND=stub and GEMINI_BASE_URL
+# pointing at the fake. Then N simulated candidates each run
+#
+#   register -> login -> upload_resume (+ poll until indexed) -> start -> 5 x (ask, audio, answer) -> summary
+#
+# and the script reports interviews/min, requests/s and latency percentiles
+# per endpoint. The embedding model still runs for real, so it must be in the
+# local sentence-transformers cache.
+import io
+import os
+import sys
+import json
+import math
+import time
+import wave
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTIONS_PER_INTERVIEW = 5
+
+
+# ===== Fake Gemini =====
+EVALUATION_REPLY = {
+    "technical_score": 6, "completeness_score": 7, "communication_score": 7,
+    "depth_of_knowledge": 6, "problem_solving_score": 6, "verdict": "Intermediate",
+    "strengths": ["Clear structure"], "weaknesses": ["Few concrete examples"],
+    "recommendations": ["Quantify impact"], "summary": "Reasonable answer with room for depth.",
+}
+SUMMARY_REPLY = {
+    "technical_level": "Intermediate",
+    "key_strengths": ["Communication"], "key_weaknesses": ["Depth"],
+    "recommended_actions": {"technical": ["Practice system design"], "soft_skills": ["Be concise"]},
+    "stage_performance": {"introduction_resume_stage": "Good", "technical_stage": "Fair", "hr_stage": "Good"},
+    "summary": "Candidate communicates clearly and shows solid fundamentals but needs deeper technical examples "
+               "and more quantified impact to reach senior level.",
+}
+
+
+class FakeGemini:
+    """generateContent look-alike: answers by prompt type after a simulated delay."""
+
+    def __init__(self, latency_ms=800, jitter_ms=200, rate_429=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def reply_for(self, prompt):
+        if "Evaluate 1 interview answer" in prompt:
+            return json.dumps(EVALUATION_REPLY)
+        if "final interview report" in prompt:
+            return "```json\n" + json.dumps(SUMMARY_REPLY) + "\n```"
+        if "Rewrite the following technical interview question" in prompt:
+            return "How does Python manage memory for short-lived objects?"
+        return f"Can you walk me through a project where you {self.rng.choice(['led', 'debugged', 'designed', 'shipped'])} something under a tight deadline?"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt = body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+                with fake.lock:
+                    fake.calls += 1
+                    throttle = fake.rng.random() < fake.rate_429
+                    delay = max(0.0, fake.rng.gauss(fake.latency_ms, fake.jitter_ms)) / 1000
+                    fake.throttled += throttle
+                if throttle:
+                    time.sleep(0.02)
+                    self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted"}})
+                    return
+                time.sleep(delay)
+                self._send(200, {"candidates": [{"content": {"parts": [{"text": fake.reply_for(prompt)}]}}]})
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+# ===== Test Data =====
+def make_answer_wav(seconds, seed):
+    """16 kHz mono WAV: a second of silence, `seconds` of voiced tones, a second of silence."""
+    rng = random.Random(seed)
+    sr = 16000
+    samples = [0] * sr
+    for _ in range(int(seconds * 4)):
+        freq = rng.uniform(120, 260)
+        samples += [int(9000 * math.sin(2 * math.pi * freq * i / sr)) for i in range(sr // 4)]
+    samples += [0] * sr
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(b"".join(s.to_bytes(2, "little", signed=True) for s in samples))
+    return buf.getvalue()
+
+
+def make_resume_pdf(lines, lines_per_page=50):
+    """Minimal PDF with the given text lines (Helvetica), parseable by pdfplumber."""
+    def esc(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    font_obj = 3 + 2 * len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>",
+    ]
+    for i, page_lines in enumerate(pages):
+        stream = "BT /F1 11 Tf 14 TL 50 780 Td " + " ".join(f"({esc(line)}) '" for line in page_lines) + " ET"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_obj} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+RESUME_LINES = [
+    "Jordan Candidate - Software Engineer",
+    "Experience: 3 years building Python and Flask REST APIs at Acme Corp",
+    "Migrated reporting jobs to Celery and Redis, cutting runtime by 40%",
+    "Built React dashboards for client operations teams",
+    "Skills: Python, Java, SQL, PostgreSQL, Docker, AWS",
+    "Education: B.Tech Computer Science",
+]
+
+
+# ===== Backend Process =====
+def start_backend(args, gemini_url, workdir, extra_env=None):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(args.port),
+        "HOST": "127.0.0.1",
+        "CACHE_BACKEND": args.cache_backend,
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'load_test.db')}",
+        # Fresh DBs reuse user ids 1..N; keep their indexes out of the checkout
+        "RESUME_INDEX_DIR": os.path.join(workdir, "resumes"),
+        "TTS_BACKEND": "stub",
+        "STT_BACKEND": "stub",
+        "STT_STUB_RTF": str(args.stt_rtf),
+        "METRICS_ENABLED": "true",
+    })
+    if gemini_url:
+        env["GEMINI_BASE_URL"] = gemini_url
+    env.update(extra_env or {})
+
+    if args.server == "gunicorn":
+        env["WEB_WORKERS"] = str(args.workers)
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+    else:
+        cmd = [sys.executable, "serve_async.py"]
+
+    log_path = os.path.join(workdir, "backend.log")
+    log = open(log_path, "w")
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Backend exited during startup, see {log_path}")
+        try:
+            if requests.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return proc, base_url, log_path
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError(f"Backend not ready after {args.startup_timeout}s, see {log_path}")
+
+
+# ===== Simulated Candidate =====
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def call(self, name, fn):
+        start = time.perf_counter()
+        try:
+            resp = fn()
+        except requests.RequestException as e:
+            self._error(name, type(e).__name__)
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+        if resp.status_code >= 400:
+            self._error(name, resp.status_code)
+            raise RuntimeError(f"{name} returned {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    def _error(self, name, reason):
+        with self.lock:
+            key = f"{name} {reason}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def upload_resume(http, base_url, pdf, args, rec, poll_interval=0.2):
+    """Upload, then poll the ingestion job; resume_ready is upload-to-indexed time."""
+    start = time.perf_counter()
+    job = rec.call("upload_resume", lambda: http.post(
+        f"{base_url}/api/interview/upload_resume", files={"resume": ("resume.pdf", pdf, "application/pdf")},
+        timeout=args.timeout)).json()
+    deadline = time.time() + args.timeout
+    while job.get("status") not in ("done", "failed", "superseded"):
+        if time.time() > deadline:
+            raise RuntimeError(f"resume job {job.get('job_id')} still {job.get('status')}")
+        time.sleep(poll_interval)
+        job = http.get(f"{base_url}{job.get('status_url') or '/api/interview/upload_resume/' + job['job_id']}",
+                       timeout=args.timeout).json()
+    if job["status"] != "done":
+        rec._error("resume_ready", job["status"])
+        raise RuntimeError(f"resume job {job['status']}: {job.get('error')}")
+    with rec.lock:
+        rec.latencies.setdefault("resume_ready", []).append((time.perf_counter() - start) * 1000)
+    return job
+
+
+def run_candidate(n, base_url, args, rec, run_id):
+    http = requests.Session()
+    api = f"{base_url}/api"
+    think = lambda: time.sleep(args.think_ms / 1000) if args.think_ms else None
+    email = f"load{run_id}_{n}@example.com"
+
+    rec.call("register", lambda: http.post(f"{api}/auth/register", json={
+        "username": f"load{run_id}_{n}", "email": email, "password": "load-test-pass"}, timeout=args.timeout))
+    token = rec.call("login", lambda: http.post(f"{api}/auth/login", json={
+        "email": email, "password": "load-test-pass"}, timeout=args.timeout)).json()["token"]
+    http.headers["Authorization"] = f"Bearer {token}"
+
+    if not args.skip_resume:
+        upload_resume(http, base_url, make_resume_pdf(RESUME_LINES), args, rec)
+
+    session_id = rec.call("start", lambda: http.post(f"{api}/interview/start", timeout=args.timeout)).json()["session_id"]
+
+    for i in range(QUESTIONS_PER_INTERVIEW):
+        think()
+        question = rec.call("ask", lambda: http.post(f"{api}/interview/ask", json={
+            "session_id": session_id, "topic": "general"}, timeout=args.timeout)).json()
+        if question.get("done"):
+            break
+        if question.get("audio_url"):
+            rec.call("audio", lambda: http.get(f"{base_url}{question['audio_url']}", timeout=args.timeout))
+
+        think()
+        audio = make_answer_wav(args.answer_seconds, seed=n * 10 + i)
+        rec.call("answer", lambda: http.post(f"{api}/interview/answer", data={
+            "session_id": session_id, "question_id": question["question_id"],
+            "sample_answer": question.get("sample_answer", "")},
+            files={"audio": ("answer.wav", audio, "audio/wav")}, timeout=args.timeout))
+
+    rec.call("summary", lambda: http.post(f"{api}/interview/summary", json={"session_id": session_id}, timeout=args.timeout))
+
+
+# ===== Reporting =====
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(math.ceil(q * len(sorted_values))) - 1)]
+
+
+def build_report(rec, elapsed, completed, failed, gemini):
+    endpoints = {}
+    total_requests = 0
+    for name, values in rec.latencies.items():
+        values = sorted(values)
+        total_requests += len(values)
+        endpoints[name] = {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.50), 1),
+            "p90_ms": round(percentile(values, 0.90), 1),
+            "p99_ms": round(percentile(values, 0.99), 1),
+            "max_ms": round(values[-1], 1),
+            "mean_ms": round(statistics.fmean(values), 1),
+        }
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "interviews_completed": completed,
+        "interviews_failed": failed,
+        "interviews_per_min": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "requests": total_requests,
+        "requests_per_s": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+        "errors": rec.errors,
+        "gemini": {"calls": gemini.calls, "throttled_429": gemini.throttled} if gemini else None,
+    }
+
+
+def print_report(report, args):
+    print(f"\n=== {args.candidates} candidates, concurrency {args.concurrency or args.candidates}, "
+          f"server {args.server if not args.target else args.target} ===")
+    print(f"completed {report['interviews_completed']}  failed {report['interviews_failed']}  "
+          f"in {report['elapsed_s']} s  ->  {report['interviews_per_min']} interviews/min, "
+          f"{report['requests_per_s']} req/s")
+    print(f"\n{'endpoint':<15} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    order = ["register", "login", "upload_resume", "resume_ready", "start", "ask", "audio", "answer", "summary"]
+    for name in sorted(report["endpoints"], key=lambda n: order.index(n) if n in order else len(order)):
+        e = report["endpoints"][name]
+        print(f"{name:<15} {e['count']:>6} {e['p50_ms']:>9.1f} {e['p90_ms']:>9.1f} {e['p99_ms']:>9.1f} {e['max_ms']:>9.1f}")
+    if report["errors"]:
+        print("\nerrors:")
+        for key, count in sorted(report["errors"].items()):
+            print(f"  {key}: {count}")
+    if report["gemini"]:
+        print(f"\nfake gemini: {report['gemini']['calls']} calls, {report['gemini']['throttled_429']} throttled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent end-to-end interview load test")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=0, help="simultaneous candidates (default: all)")
+    parser.add_argument("--think-ms", type=int, default=0, help="pause before each ask/answer")
+    parser.add_argument("--answer-seconds", type=float, default=8)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=200)
+    parser.add_argument("--gemini-429-rate", type=float, default=0.0)
+    parser.add_argument("--stt-rtf", type=float, default=0.0, help="stub STT seconds of compute per audio second")
+    parser.add_argument("--server", default="async", choices=("async", "gunicorn"))
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--cache-backend", default="memory", choices=("memory", "redis"))
+    parser.add_argument("--database-url", help="default: a temp SQLite file")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--target", help="use an already running backend instead of starting one")
+    parser.add_argument("--no-fakes", action="store_true", help="with --target: don't start the fake Gemini")
+    parser.add_argument("--skip-resume", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.server == "gunicorn" and args.workers > 1 and args.cache_backend == "memory" and not args.target:
+        parser.error("the memory cache is per-process; use --cache-backend redis with several workers")
+
+    gemini = None if args.no_fakes else FakeGemini(
+        args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_429_rate).start()
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    proc = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            proc, base_url, log_path = start_backend(args, gemini.url if gemini else None, workdir)
+            print(f"Backend ready at {base_url} (log: {log_path})")
+
+        rec = Recorder()
+        run_id = int(time.time())
+        completed = failed = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.candidates) as pool:
+            futures = [pool.submit(run_candidate, n, base_url, args, rec, run_id) for n in range(args.candidates)]
+            for future in futures:
+                try:
+                    future.result()
+                    completed += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"[LOAD] Candidate failed: {e}")
+        elapsed = time.perf_counter() - started
+
+        report = build_report(rec, elapsed, completed, failed, gemini)
+        print_report(report, args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(dict(report, config=vars(args)), f, indent=2)
+            print(f"\n📄 Report written to {args.output}")
+        return 0 if failed == 0 else 1
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if gemini:
+            gemini.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# Replay recorded interview sessions against the backend.
+#
+#   RECORD_SESSIONS=true python serve_async.py              # record real traffic into recordings/
+#   python benchmarks/replay.py recordings/ --speed 4       # replay every session at 4x
+#   python benchmarks/replay.py recordings/session_ab12.jsonl --speed 1 --loops 3 --output after.json
+#
+# Each recording (see utils/recorder.py) is replayed by its own simulated
+# candidate: a fresh user uploads a synthetic resume with the recorded size,
+# then the recorded requests are sent with their original spacing divided by
+# --speed. The backend runs with REPLAY_ENABLED=true and RECORDINGS_DIR set
+# to the recordings' directory, so Gemini outputs, transcripts and TTS audio
+# are served from the recording (after their recorded latency / speed)
+# instead of calling out. Answer audio is sent as random bytes of the
+# recorded size, as its transcript comes from the recording anyway.
+#
+# Same report as load_test.py; compare two --output files for before/after.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_test import BACKEND_DIR, Recorder, build_report, print_report, make_resume_pdf, start_backend, upload_resume
+sys.path.insert(0, BACKEND_DIR)
+from utils.recorder import load_recording
+
+WORDS = ("python", "flask", "service", "team", "project", "client", "data", "design", "deploy", "api")
+DISCARD_URL = "http://127.0.0.1:9"  # any real Gemini call during replay fails fast
+
+
+def load_recordings(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".jsonl"))
+        else:
+            files.append(path)
+
+    recordings = []
+    for path in files:
+        header, events = load_recording(path)
+        if events and events[0]["endpoint"] == "start":
+            recordings.append({"name": os.path.basename(path), "dir": os.path.dirname(os.path.abspath(path)),
+                               "header": header, "events": events})
+        else:
+            print(f"[REPLAY] Skipping {path}: no recorded /start")
+    return recordings
+
+
+def synthetic_resume(chars, lines, seed):
+    rng = random.Random(seed)
+    width = max(10, chars // max(1, lines))
+    out = []
+    for _ in range(lines):
+        line = ""
+        while len(line) < width:
+            line += rng.choice(WORDS) + " "
+        out.append(line[:width].strip())
+    return out
+
+
+ENDPOINT_PATHS = {
+    "start": "/api/interview/start",
+    "ask": "/api/interview/ask",
+    "answer": "/api/interview/answer",
+    "answer_chunk": "/api/interview/answer/chunk",
+    "answer_finish": "/api/interview/answer/finish",
+    "summary": "/api/interview/summary",
+}
+
+
+def replay_session(n, recording, base_url, args, rec, run_id):
+    http = requests.Session()
+    email = f"replay{run_id}_{n}@example.com"
+    rec.call("register", lambda: http.post(f"{base_url}/api/auth/register", json={
+        "username": f"replay{run_id}_{n}", "email": email, "password": "replay-pass"}, timeout=args.timeout))
+    token = rec.call("login", lambda: http.post(f"{base_url}/api/auth/login", json={
+        "email": email, "password": "replay-pass"}, timeout=args.timeout)).json()["token"]
+    http.headers["Authorization"] = f"Bearer {token}"
+
+    header = recording["header"]
+    if header.get("resume_chars"):
+        lines = synthetic_resume(header["resume_chars"], max(1, header.get("resume_lines", 1)), seed=n)
+        upload_resume(http, base_url, make_resume_pdf(lines), args, rec)
+
+    session_id, question_id = None, None
+    previous_ts = recording["events"][0]["ts"]
+    for index, event in enumerate(recording["events"]):
+        gap = max(0.0, event["ts"] - previous_ts) / args.speed
+        previous_ts = event["ts"]
+        if gap:
+            time.sleep(gap)
+
+        headers = {
+            "X-Replay-Recording": recording["name"],
+            "X-Replay-Event": str(index),
+            "X-Replay-Speed": str(args.speed),
+        }
+        body = dict(event.get("json") or {})
+        form = dict(event.get("form") or {})
+        for fields in (body, form):
+            if "session_id" in fields:
+                fields["session_id"] = session_id
+            if "question_id" in fields and question_id:
+                fields["question_id"] = question_id
+        files = {
+            field: (f"{field}{meta.get('ext', '')}", os.urandom(meta["bytes"]), meta.get("content_type"))
+            for field, meta in (event.get("files") or {}).items()
+        }
+
+        url = f"{base_url}{ENDPOINT_PATHS[event['endpoint']]}"
+        if event.get("json") is not None:
+            send = lambda: http.post(url, json=body, headers=headers, timeout=args.timeout)
+        else:
+            send = lambda: http.post(url, data=form, files=files or None, headers=headers, timeout=args.timeout)
+        resp = rec.call(event["endpoint"], send)
+
+        payload = resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {}
+        if event["endpoint"] == "start":
+            session_id = payload["session_id"]
+        elif event["endpoint"] == "ask" and payload.get("question_id"):
+            question_id = payload["question_id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded interview sessions")
+    parser.add_argument("recordings", nargs="+", help="recording files or directories")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (2 = twice as fast)")
+    parser.add_argument("--loops", type=int, default=1, help="replay each recording this many times")
+    parser.add_argument("--concurrency", type=int, default=0, help="simultaneous sessions (default: all)")
+    parser.add_argument("--server", default="async", choices=("async", "gunicorn"))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--cache-backend", default="memory", choices=("memory", "redis"))
+    parser.add_argument("--database-url")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--target", help="already running backend started with REPLAY_ENABLED=true")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=180)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    # Fields print_report expects from the load test
+    args.candidates, args.stt_rtf = 0, 0.0
+
+    recordings = load_recordings(args.recordings)
+    if not recordings:
+        print("No recordings to replay")
+        return 1
+    if len({r["dir"] for r in recordings}) > 1 and not args.target:
+        parser.error("all recordings must be in one directory (it becomes the backend's RECORDINGS_DIR)")
+    jobs = [r for r in recordings for _ in range(args.loops)]
+    args.candidates = len(jobs)
+
+    workdir = tempfile.mkdtemp(prefix="replay_")
+    proc = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            proc, base_url, log_path = start_backend(args, DISCARD_URL, workdir, extra_env={
+                "REPLAY_ENABLED": "true",
+                "RECORD_SESSIONS": "false",
+                "RECORDINGS_DIR": recordings[0]["dir"],
+            })
+            print(f"Backend ready at {base_url} (log: {log_path})")
+
+        rec = Recorder()
+        run_id = int(time.time())
+        completed = failed = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency or len(jobs)) as pool:
+            futures = [pool.submit(replay_session, n, job, base_url, args, rec, run_id) for n, job in enumerate(jobs)]
+            for future in futures:
+                try:
+                    future.result()
+                    completed += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"[REPLAY] Session failed: {e}")
+        elapsed = time.perf_counter() - started
+
+        report = build_report(rec, elapsed, completed, failed, None)
+        print_report(report, args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(dict(report, config=vars(args), recordings=[r["name"] for r in recordings]), f, indent=2)
+            print(f"\n📄 Report written to {args.output}")
+        return 0 if failed == 0 else 1
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
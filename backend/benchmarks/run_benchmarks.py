@@ -0,0 +1,303 @@
+# Micro-benchmarks for the backend hot paths.
+#
+#   python benchmarks/run_benchmarks.py                       # all, results -> benchmarks/results/<commit>.json
+#   python benchmarks/run_benchmarks.py -k script --quick     # subset, fewer rounds
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json
+#
+# Runs offline: the cache is the in-process backend (CACHE_BACKEND=memory
+# unless --cache-backend redis), no LLM/TTS calls are made and resume indexes
+# go to a temp dir. The embedding model must already be in the local
+# sentence-transformers cache. Search benchmarks grow the question bank with
+# random vectors so FAISS cost can be measured at sizes we don't have yet.
+#
+# --compare exits 1 if any benchmark's median is more than --threshold
+# slower than in the baseline file.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+BANK_DIR = os.path.join(BACKEND_DIR, "bank")
+
+BANK_SIZES = (100, 1000, 10000)
+RESUME_LINES = (20, 60, 200)
+TRANSCRIPT_WORDS = (50, 200, 1000, 5000)
+CONTEXT_QUESTIONS = (1, 5, 20)
+
+RESUME_LINE_TEMPLATES = [
+    "Built {tech} services handling {n}k requests per minute at {company}",
+    "Led migration of the {tech} monolith to microservices, cutting p99 latency by {n}%",
+    "Designed {tech} data pipelines processing {n} GB of events daily",
+    "Mentored {n} engineers and ran code reviews for the {tech} platform team",
+    "Skills: {tech}, Docker, Kubernetes, PostgreSQL, Redis, AWS",
+    "Reduced cloud spend by {n}% by rightsizing {tech} workloads at {company}",
+]
+TECH = ["Python", "Java", "Go", "React", "Spark", "Flask", "Django", "Kafka", "TypeScript"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+
+
+# ===== Harness =====
+def measure(fn, min_time=0.5, max_rounds=1000, warmup=2):
+    """Call fn repeatedly; returns timing stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_rounds and (time.perf_counter() - started < min_time or len(samples) < 5):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "rounds": len(samples),
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def fake_resume(lines, seed=0):
+    rng = random.Random(seed)
+    return "\n".join(
+        rng.choice(RESUME_LINE_TEMPLATES).format(
+            tech=rng.choice(TECH), company=rng.choice(COMPANIES), n=rng.randint(2, 90)
+        )
+        for _ in range(lines)
+    )
+
+
+def fake_transcript(words, seed=0):
+    from utils.script_detect import get_script_index
+    rng = random.Random(seed)
+    vocab = " ".join(e.get("answer", "") for e in get_script_index().entries).split() or TECH
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+# ===== Benchmarks =====
+# Each benchmark group is a generator yielding (name, fn) or (name, fn, options);
+# setup happens in the generator and stays in place while fn is measured.
+def bench_search_questions():
+    import numpy as np
+    import faiss
+    from utils import faiss_index
+    from utils.embeddings import encode
+
+    dim = encode(["dimension probe"]).shape[1]
+    original = faiss_index.get_question_index()
+    rng = np.random.RandomState(0)
+    try:
+        for size in BANK_SIZES:
+            index = faiss.IndexFlatL2(dim)
+            index.add(rng.rand(size, dim).astype("float32"))
+            data = [{"question": f"Question {i}", "answer": ""} for i in range(size)]
+            faiss_index._question_bank = (index, data)
+            yield f"search_questions[bank={size}]", lambda: faiss_index.search_questions("Explain Python decorators", k=3)
+    finally:
+        faiss_index._question_bank = original
+
+
+def bench_resume_index():
+    import shutil
+    from utils import resume_index
+
+    original_dir = resume_index.RESUME_INDEX_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        resume_index.RESUME_INDEX_DIR = tmp
+        try:
+            for lines in RESUME_LINES:
+                resume = fake_resume(lines)
+                user_id = f"bench{lines}"
+
+                def cold_build():
+                    shutil.rmtree(os.path.join(tmp, user_id), ignore_errors=True)
+                    resume_index.build_resume_index(user_id, resume)
+
+                yield f"chunk_resume[lines={lines}]", lambda: resume_index.chunk_resume(resume)
+                yield f"build_resume_index[lines={lines}]", cold_build, {"max_rounds": 50}
+                # Same resume again: every chunk's vector is reused
+                yield f"reindex_unchanged[lines={lines}]", lambda: resume_index.build_resume_index(user_id, resume), {"max_rounds": 50}
+                yield f"search_resume[lines={lines}]", lambda: resume_index.search_resume(user_id, "Kubernetes migration experience", k=3)
+        finally:
+            resume_index.RESUME_INDEX_DIR = original_dir
+
+
+def bench_context():
+    from utils.cache import init_context, load_context, append_context, cleanup_session_cache
+
+    for n in CONTEXT_QUESTIONS:
+        user_id, session_id = "bench", f"ctx{n}"
+        init_context(user_id, session_id)
+        for i in range(n):
+            append_context(user_id, session_id, incr=1, questions=f"Question {i}?",
+                           sample_answers="sample " * 40,
+                           answers={"question": f"Question {i}?", "answer": "answer " * 120})
+        yield f"load_context[questions={n}]", lambda: load_context(user_id, session_id)
+        yield f"load_context_fields[questions={n}]", lambda: load_context(user_id, session_id, fields=("questions", "answers"))
+        cleanup_session_cache(user_id, session_id)
+
+    counter = iter(range(10 ** 9))
+    yield "append_context", lambda: append_context(
+        "bench", "append", incr=1, fields={"stage": "technical"},
+        answers={"question": f"Q{next(counter)}", "answer": "answer " * 120})
+    cleanup_session_cache("bench", "append")
+
+
+def bench_script_detection():
+    from utils.script_detect import detect_scripted_answer, get_script_index
+
+    get_script_index()
+    for words in TRANSCRIPT_WORDS:
+        text = fake_transcript(words)
+        yield f"detect_scripted_answer[words={words}]", lambda: detect_scripted_answer(text, sample_answer="sample answer " * 30)
+
+
+def bench_pdf_extraction():
+    from book_rag import extract_qa_from_pdf
+
+    pdfs = sorted(f for f in os.listdir(BANK_DIR) if f.lower().endswith(".pdf")) if os.path.isdir(BANK_DIR) else []
+    for name in pdfs:
+        path = os.path.join(BANK_DIR, name)
+        yield f"extract_qa_from_pdf[{name}]", lambda: extract_qa_from_pdf(path), {"max_rounds": 10, "warmup": 1}
+
+
+def bench_llm_json():
+    from utils.llm import parse_llm_json
+
+    evaluation = {
+        "technical_score": 7, "completeness_score": 6, "communication_score": 8,
+        "depth_of_knowledge": 6, "problem_solving_score": 7, "verdict": "Intermediate",
+        "strengths": ["clear structure"] * 3, "weaknesses": ["no complexity analysis"] * 3,
+        "recommendations": ["practice system design"] * 3, "summary": "Solid answer " * 10,
+    }
+    plain = json.dumps(evaluation)
+    samples = {
+        "plain": plain,
+        "fenced": f"```json\n{json.dumps(evaluation, indent=2)}\n```",
+        "summary": json.dumps({"stage_performance": {s: evaluation for s in ("intro", "resume", "technical", "hr")}}),
+    }
+    for label, raw in samples.items():
+        yield f"parse_llm_json[{label}]", lambda: parse_llm_json(raw)
+
+    def invalid():
+        try:
+            parse_llm_json("The candidate did well overall. " * 20)
+        except ValueError:
+            pass
+    yield "parse_llm_json[invalid]", invalid
+
+
+# group -> (generator, names it yields, minus the [params] suffix). The names
+# let -k pick groups without running their setup (which may load models).
+BENCHMARKS = {
+    "search_questions": (bench_search_questions, ("search_questions",)),
+    "resume_index": (bench_resume_index, ("chunk_resume", "build_resume_index", "reindex_unchanged", "search_resume")),
+    "context": (bench_context, ("load_context", "load_context_fields", "append_context")),
+    "script_detection": (bench_script_detection, ("detect_scripted_answer",)),
+    "pdf_extraction": (bench_pdf_extraction, ("extract_qa_from_pdf",)),
+    "llm_json": (bench_llm_json, ("parse_llm_json",)),
+}
+
+
+def group_selected(group, names, pattern):
+    # A bare parameter filter like "lines=20" can match any group
+    if not pattern or pattern in group or "=" in pattern.split("[", 1)[0]:
+        return True
+    return any(pattern in name or pattern.split("[", 1)[0] == name for name in names)
+
+
+# ===== Reporting =====
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    print(f"\n{'benchmark':<55} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = stats["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        flag = "  ❌" if change > threshold else ""
+        print(f"{name:<55} {base['median_ms']:>10.3f} {stats['median_ms']:>10.3f} {change:>+7.0%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend hot-path micro-benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer rounds, for a smoke run")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline results file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown vs baseline")
+    parser.add_argument("--cache-backend", default="memory", choices=("memory", "redis"))
+    args = parser.parse_args()
+
+    os.environ["CACHE_BACKEND"] = args.cache_backend
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    opts = {"min_time": 0.1 if args.quick else 0.5, "max_rounds": 50 if args.quick else 1000}
+
+    results = {}
+    for group, (bench, names) in BENCHMARKS.items():
+        if not group_selected(group, names, args.filter):
+            continue
+        for name, fn, *overrides in bench():
+            if args.filter and args.filter not in name and args.filter not in group:
+                continue
+            run_opts = dict(opts)
+            for key, value in (overrides[0] if overrides else {}).items():
+                run_opts[key] = min(run_opts.get(key, value), value)
+            stats = results[name] = measure(fn, **run_opts)
+            print(f"{name:<55} median {stats['median_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms  ({stats['rounds']} rounds)")
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "cache_backend": args.cache_backend,
+                "quick": args.quick,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n📄 Results written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,8 @@
 import os
 import json
-import faiss
 import pdfplumber
 import re
-from sentence_transformers import SentenceTransformer
+from utils.embeddings import encode
 from uuid import uuid4
 
 # ===== Paths =====
@@ -17,10 +16,6 @@ PDF_FILES = [
 OUTPUT_JSON = "embeddings/question_data.json"
 OUTPUT_INDEX = "embeddings/question_index.faiss"
 
-# ===== Embedding Model =====
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-
 def extract_qa_from_pdf(pdf_path):
     """
     Extract Q&A pairs from PDFs with format-specific logic.
@@ -122,7 +117,8 @@ def book_rag():
         raise ValueError("❌ No questions extracted from any PDF.")
 
     questions = [item["question"] for item in all_data]
-    embeddings = model.encode(questions, convert_to_numpy=True)
+    import faiss
+    embeddings = encode(questions)
 
     if embeddings.ndim != 2 or embeddings.shape[0] == 0:
         raise ValueError("❌ No valid embeddings generated. Check input questions.")
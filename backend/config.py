@@ -8,10 +8,26 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     # Redis
+    REDIS_URL = os.getenv("REDIS_URL")
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 2))        # wait for a free connection
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2))
+    REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 1))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
 
-    # Gemini API
+    # Cache backend: "redis" or "memory" (in-process, single node / benchmarks)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis")
+
+    # Text-to-speech backend: "gtts" (remote), "local" (pyttsx3, offline) or "stub"
+    TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+
+    # Speech-to-text backend: "whisper" or "stub" (deterministic, for load tests)
+    STT_BACKEND = os.getenv("STT_BACKEND", "whisper")
+
+    # Gemini API (base URL is overridable so load tests can point at a fake server)
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your_gemini_key")
     GEMINI_API_KEY1 = os.getenv("GEMINI_API_KEY1", "your_gemini_key1")
     GEMINI_API_KEY2 = os.getenv("GEMINI_API_KEY2", "your_gemini_key2")
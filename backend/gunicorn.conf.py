@@ -0,0 +1,51 @@
+# Production entry point.
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# The master imports the app once (preload_app), creates/upgrades the schema
+# and loads the embedding model, question bank index and optionally Whisper
+# (PRELOAD_WHISPER=true) before forking, so workers start with the weights
+# already mapped. Each worker then runs a tiny encode/search/transcribe before
+# taking traffic; /ready returns 503 until that has happened.
+#
+# CACHE_BACKEND=memory is per-process, so use it only with WEB_WORKERS=1.
+import os
+
+worker_class = os.getenv("WORKER_CLASS", "gevent")
+
+if worker_class == "gevent":
+    # Patch before the app (and its sockets/locks) is imported in the master
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_WORKERS", 2))
+worker_connections = int(os.getenv("ASYNC_MAX_CONNECTIONS", 1000))
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", 120))          # Whisper on a long answer
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+accesslog = "-"
+
+INIT_DB_ON_START = os.getenv("INIT_DB_ON_START", "true").lower() == "true"
+
+
+def on_starting(server):
+    """Master, after the app is imported and before any worker is forked."""
+    from app import init_db
+    from utils.warmup import preload
+
+    if INIT_DB_ON_START:
+        init_db()
+    preload()
+
+
+def post_worker_init(worker):
+    """Worker, after fork and before it accepts connections."""
+    from utils.concurrency import CPU_WORKERS
+    from utils.warmup import warmup
+
+    if worker_class == "gevent":
+        from gevent import get_hub
+        get_hub().threadpool.maxsize = CPU_WORKERS
+    warmup()
@@ -1,37 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file, url_for, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, InterviewSession, InterviewQuestion, User
-from utils.faiss_index import search_questions, search_resume, build_resume_index
-from utils.tts import get_tts
+from sqlalchemy import func, or_, and_
+from datetime import datetime
+from models import db, InterviewSession, InterviewQuestion, User, UserPerformance
+from utils.faiss_index import search_questions
+from utils.resume_index import search_resume
+from utils.resume_ingest import submit_resume, get_job
+from utils.tts import get_tts, get_cached_tts, audio_content_type
 from utils.stt import transcribe_audio
+from utils.stt_stream import append_audio_chunk, finish_audio_stream
+from utils.script_detect import detect_scripted_answer
+from utils.performance import update_user_rollup, serialize_rollup
 from utils.llm import generate_followup, generate_summary, generate_evaluation, _call_gemini,key_rotator
-from utils.cache import r, is_scripted_answer, cleanup_session_cache
+from utils.cache import (
+    cleanup_session_cache,
+    store_evaluation, get_all_cached_evaluations,
+    get_resume_text, single_flight,
+    init_context, load_context, append_context, set_context_fields
+)
+import io
 import json
 import hashlib
-import pdfplumber
 import re
 
 interview_bp = Blueprint("interview", __name__)
 
-# ===== Helper functions for Redis context =====
-def _context_key(user_id, session_id):
-    return f"ctx:{user_id}:{session_id}"
-
-def _load_context(user_id, session_id):
-    data = r.get(_context_key(user_id, session_id))
-    return json.loads(data) if data else {
-        "topics": [],
-        "questions": [],
-        "sample_answers": [],
-        "evaluations": [],
-        "answers": [],
-        "question_count": 0,
-        "stage": "intro"
-    }
-
-def _save_context(user_id, session_id, context):
-    r.setex(_context_key(user_id, session_id), 86400, json.dumps(context))  # 1 day TTL
-
 def _get_stage(q_count):
 
     """
@@ -46,6 +39,16 @@ def _get_stage(q_count):
     else:
         return "closing"
 
+def _stage_for_index(idx):
+    """Stage of the idx-th (0-based) question in the 5-question flow."""
+    if idx == 0:
+        return "intro"
+    elif idx in (1, 2):
+        return "resume"
+    elif idx == 3:
+        return "technical"
+    return "hr"
+
 # ===== Start Interview =====
 @interview_bp.route("/start", methods=["POST"])
 @jwt_required()
@@ -55,15 +58,7 @@ def start_interview():
     db.session.add(session)
     db.session.commit()
 
-    _save_context(user_id, session.id, {
-        "topics": [],
-        "questions": [],
-        "sample_answers": [],
-        "evaluations": [],
-        "answers": [],
-        "question_count": 0,
-        "stage": "intro"
-    })
+    init_context(user_id, session.id)
 
     return jsonify({"session_id": session.id})
 
@@ -81,7 +76,9 @@ def ask_question():
         return jsonify({"error": "session_id and topic are required"}), 400
 
     # Load context
-    context = _load_context(user_id, session_id)
+    context = load_context(user_id, session_id, fields=(
+        "question_count", "questions", "sample_answers", "answers", "evaluations"
+    ))
     q_count = context.get("question_count", 0)
 
     # ✅ Stop after exactly 5 questions
@@ -117,30 +114,52 @@ def ask_question():
     # Generate question ID
     question_id = hashlib.md5(question_text.encode()).hexdigest()
 
-    # Append to context
-    context["stage"] = stage
-    context["question_count"] = q_count + 1
-    context["topics"].append(topic)
-    context["questions"].append(question_text)
-    context["sample_answers"].append(sample_answer or "")
-    _save_context(user_id, session_id, context)
+    # Append to context (generate_followup already appended the question
+    # and its sample answer)
+    append_context(user_id, session_id, incr=1, fields={"stage": stage}, topics=topic)
 
-    # Generate TTS
+    # Generate TTS (served separately by /audio/<question_id>)
     try:
         audio_bytes = get_tts(question_id, question_text)
     except Exception as e:
         print(f"Error in get_tts: {str(e)}")
         return jsonify({"error": "Failed to generate audio"}), 500
 
+    if not audio_bytes:
+        return jsonify({"error": "Failed to generate audio"}), 500
+
     return jsonify({
         "question_id": question_id,
         "question": question_text,
-        "audio": audio_bytes.hex(),
+        "audio_url": url_for("interview.get_question_audio", question_id=question_id),
         "sample_answer": sample_answer,
         "stage": stage
     })
 
 
+# ===== Question Audio =====
+@interview_bp.route("/audio/<question_id>", methods=["GET"])
+def get_question_audio(question_id):
+    """
+    Serve cached question audio as binary. question_id is a hash of the
+    question text, so the bytes never change for a given id and can be
+    cached by browsers/CDNs; no JWT so <audio src> can load it directly.
+    """
+    audio_bytes = get_cached_tts(question_id)
+    if not audio_bytes:
+        return jsonify({"error": "Audio not found or expired"}), 404
+
+    response = send_file(
+        io.BytesIO(audio_bytes),
+        mimetype=audio_content_type(audio_bytes),
+        conditional=True,  # handles If-None-Match and Range
+        etag=hashlib.md5(audio_bytes).hexdigest(),
+        max_age=86400
+    )
+    response.cache_control.immutable = True
+    return response
+
+
 # ===== Submit Answer =====
 @interview_bp.route("/answer", methods=["POST"])
 @jwt_required()
@@ -156,8 +175,6 @@ def submit_answer():
     if not session_id or not question_id or not audio_file:
         return jsonify({"error": "session_id, question_id, and audio are required"}), 400
 
-    context = _load_context(user_id, session_id)
-
     try:
         transcript = transcribe_audio(audio_file.read())
     except Exception as e:
@@ -167,7 +184,55 @@ def submit_answer():
     if not transcript:
         return jsonify({"error": "Failed to transcribe audio: empty transcript"}), 500
 
-    flagged = is_scripted_answer(transcript, sample_answer)
+    return jsonify(_record_answer(user_id, session_id, question_id, sample_answer, transcript))
+
+
+# ===== Streaming Answer Ingest =====
+@interview_bp.route("/answer/chunk", methods=["POST"])
+@jwt_required()
+def submit_answer_chunk():
+    """Accept one recorded chunk while the candidate is still answering."""
+    user_id = int(get_jwt_identity())
+    session_id = request.form.get("session_id")
+    question_id = request.form.get("question_id")
+    audio_file = request.files.get("audio")
+
+    if not session_id or not question_id or not audio_file:
+        return jsonify({"error": "session_id, question_id, and audio are required"}), 400
+
+    partial = append_audio_chunk(user_id, session_id, question_id, audio_file.read())
+    return jsonify({"partial_transcript": partial})
+
+
+@interview_bp.route("/answer/finish", methods=["POST"])
+@jwt_required()
+def finish_answer_stream():
+    """Transcribe the tail after the last chunk and store the answer."""
+    user_id = int(get_jwt_identity())
+    session_id = request.form.get("session_id")
+    question_id = request.form.get("question_id")
+    sample_answer = request.form.get("sample_answer", "")
+    audio_file = request.files.get("audio")  # optional final chunk
+
+    if not session_id or not question_id:
+        return jsonify({"error": "session_id and question_id are required"}), 400
+
+    transcript = finish_audio_stream(
+        user_id, session_id, question_id,
+        chunk=audio_file.read() if audio_file else None
+    )
+    if not transcript:
+        return jsonify({"error": "Failed to transcribe audio: empty transcript"}), 500
+
+    return jsonify(_record_answer(user_id, session_id, question_id, sample_answer, transcript))
+
+
+def _record_answer(user_id, session_id, question_id, sample_answer, transcript):
+    """Flag, evaluate and store a transcribed answer (shared by upload and streaming)."""
+    context = load_context(user_id, session_id, fields=("stage", "questions"))
+
+    script_match = detect_scripted_answer(transcript, sample_answer)
+    flagged = script_match["scripted"]
 
         # === Pre-question evaluation (immediate) ===
     try:
@@ -177,42 +242,33 @@ def submit_answer():
             candidate_answer=transcript,
             sample_answer=sample_answer,
             stage=stage,
-            resume_text=User.query.get(user_id).resume_text or ""
+            resume_text=get_resume_text(user_id) or ""
         )
 
         # Save evaluation into context
-        context.setdefault("evaluations", []).append(eval_result)
-        _save_context(user_id, session_id, context)
+        append_context(user_id, session_id, evaluations=eval_result)
 
-        # Cache evaluation separately in Redis
-        cache_key = f"evaluation:{user_id}:{session_id}:{question_id}"
-        r.setex(cache_key, 86400, json.dumps(eval_result, ensure_ascii=False))
+        # Cache evaluation separately in Redis, keyed by question index
+        store_evaluation(user_id, session_id, len(context["questions"]) - 1, eval_result)
     except Exception as e:
         print(f"Error in pre-question evaluation: {e}")
 
     # Append answer
-    context.setdefault("answers", []).append({
+    append_context(user_id, session_id, answers={
         "question_id": question_id,
         "answer": transcript,
-        "flagged": flagged
+        "flagged": flagged,
+        "script_score": script_match["score"],
+        "script_source": script_match["source"]
     })
-    _save_context(user_id, session_id, context)
-
-    # Save raw answer to DB
-    q = InterviewQuestion(
-        session_id=session_id,
-        question=context["questions"][-1] if context["questions"] else "",
-        answer=transcript,
-        score=None,
-        flagged_script=flagged
-    )
-    db.session.add(q)
-    db.session.commit()
 
-    return jsonify({
+    # Answers are written to the DB in one batch by /summary
+    return {
         "transcript": transcript,
-        "flagged_script": flagged
-    })
+        "flagged_script": flagged,
+        "script_score": script_match["score"],
+        "script_source": script_match["source"]
+    }
 
 
 
@@ -229,15 +285,26 @@ def get_summary():
     if not session_id:
         return jsonify({"error": "session_id is required"}), 400
 
-    context = _load_context(user_id, session_id)
+    context = load_context(user_id, session_id, fields=("questions", "sample_answers", "answers"))
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    session = InterviewSession.query.filter_by(id=session_id, user_id=user_id).first()
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+
     resume_text = getattr(user, "resume_text", "")
 
     # Limit to 5 questions
     questions_limited = context.get("questions", [])[:5]
+
+    # Context already cleaned up or expired: serve the durable copy, if any
+    if not questions_limited:
+        if session.summary:
+            return jsonify(_stored_summary(session))
+        return jsonify({"error": "No interview data to summarize; the session has expired or has no questions"}), 409
+
     sample_answers_limited = context.get("sample_answers", [])[:5]
     answers = context.get("answers", [])[:5]
 
@@ -245,21 +312,11 @@ def get_summary():
     while len(answers) < len(questions_limited):
         answers.append({"answer": "", "flagged": False})
 
-    context["questions"] = questions_limited
-    context["sample_answers"] = sample_answers_limited
-    context["answers"] = answers
 
     # Build Q/A pairs
     qa_pairs = []
     for idx, (question, ans_obj) in enumerate(zip(questions_limited, answers)):
-        if idx == 0:
-            stage = "intro"
-        elif idx in (1, 2):
-            stage = "resume"
-        elif idx == 3:
-            stage = "technical"
-        else:
-            stage = "hr"
+        stage = _stage_for_index(idx)
 
         qa_pairs.append({
             "question": question,
@@ -269,24 +326,6 @@ def get_summary():
             "resume_context": resume_text
         })
 
-        # Load all pre-stored evaluations from Redis
-    eval_keys = r.keys(f"evaluation:{user_id}:{session_id}:*")
-    evaluations = []
-    for k in eval_keys:
-        try:
-            evaluations.append(json.loads(r.get(k)))
-        except Exception as e:
-            print(f"Error reading cached evaluation: {e}")
-
-    # Ensure order matches question list
-    if len(evaluations) < len(questions_limited):
-        evaluations += [default_eval.copy()] * (len(questions_limited) - len(evaluations))
-
-    # Ensure all evaluations have a question context
-    for i, eval in enumerate(evaluations):
-        if "question" not in eval:
-            eval["question"] = questions_limited[i] if i < len(questions_limited) else ""
-
     # Ensure length and defaults
     default_eval = {
         "question": "",
@@ -302,15 +341,64 @@ def get_summary():
         "recommendations": [],
         "summary": ""
     }
-    while len(evaluations) < len(questions_limited):
-        evaluations.append(default_eval.copy())
+
+    # Load all pre-stored evaluations from Redis in question order
+    evaluations = [
+        ev if ev is not None else default_eval.copy()
+        for ev in get_all_cached_evaluations(user_id, session_id, count=len(questions_limited))
+    ]
+
+    # Ensure all evaluations have a question context
+    for i, eval in enumerate(evaluations):
+        if "question" not in eval or not eval["question"]:
+            eval["question"] = questions_limited[i]
 
     # Save in context
-    context["evaluations"] = evaluations
-    _save_context(user_id, session_id, context)
+    set_context_fields(
+        user_id, session_id,
+        questions=questions_limited,
+        sample_answers=sample_answers_limited,
+        answers=answers,
+        evaluations=evaluations
+    )
 
-    # Generate final summary
-    summary_data = generate_summary(questions=questions_limited, evaluations=evaluations)
+    # Same questions + evaluations => same summary: reuse the stored one, and
+    # let concurrent duplicate requests share a single LLM call
+    summary_hash = hashlib.sha256(json.dumps(
+        {"questions": questions_limited, "evaluations": evaluations},
+        sort_keys=True, ensure_ascii=False
+    ).encode()).hexdigest()
+
+    if session.summary and session.summary_hash == summary_hash:
+        summary_data = session.summary
+    else:
+        summary_data = json.loads(single_flight(
+            f"summary:{session_id}:{summary_hash}",
+            lambda: json.dumps(_build_summary(questions_limited, evaluations), ensure_ascii=False).encode(),
+            ttl=3600,
+            lock_timeout=60
+        ))
+        set_context_fields(user_id, session_id, final_summary=summary_data)
+
+        if questions_limited:
+            try:
+                _persist_session_results(session, questions_limited, answers, evaluations, summary_data, summary_hash)
+            except Exception as e:
+                # Keep the Redis copy so a retry can still persist it
+                print(f"Error persisting session results: {e}")
+                return jsonify({"error": "Failed to save interview results"}), 500
+
+    # Only drop the Redis copy once the database holds the results
+    cleanup_session_cache(user_id, session_id, defer=True)
+
+    return jsonify({
+        "evaluations": evaluations,
+        "summary": summary_data
+    })
+
+
+def _build_summary(questions, evaluations):
+    summary_data = generate_summary(questions=questions, evaluations=evaluations)
 
     # Trim summary length to 21–25 words
     if isinstance(summary_data.get("summary"), str):
@@ -319,46 +407,215 @@ def get_summary():
             summary_data["summary"] = " ".join(words[:25])
         elif len(words) < 21 and words:
             summary_data["summary"] += " " + " ".join([words[-1]] * (21 - len(words)))
+    return summary_data
 
-    context["final_summary"] = summary_data
-    _save_context(user_id, session_id, context)
 
-    cleanup_session_cache(user_id, session_id, keep_fields=["evaluations", "final_summary"])
+def _stored_summary(session):
+    questions = (
+        InterviewQuestion.query
+        .filter_by(session_id=session.id)
+        .order_by(InterviewQuestion.created_at, InterviewQuestion.id)
+        .all()
+    )
+    return {
+        "evaluations": [q.score for q in questions if q.score is not None],
+        "summary": session.summary
+    }
 
-    return jsonify({
-        "evaluations": evaluations,
-        "summary": summary_data
-    })
+
+def _persist_session_results(session, questions, answers, evaluations, summary_data, summary_hash):
+    """
+    Write every answer with its evaluation, the summary and ended_at in a
+    single transaction. Rows from an earlier /summary call are updated in
+    place, so repeating it doesn't duplicate questions. Rolls back and
+    re-raises if the commit fails.
+    """
+    # Re-read under a row lock so a concurrent duplicate sees ended_at and
+    # doesn't fold the session into the rollup twice
+    session = (
+        InterviewSession.query
+        .filter_by(id=session.id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    existing = (
+        InterviewQuestion.query
+        .filter_by(session_id=session.id)
+        .order_by(InterviewQuestion.created_at, InterviewQuestion.id)
+        .all()
+    )
+
+    new_rows = []
+    for idx, question in enumerate(questions):
+        ans_obj = answers[idx] if idx < len(answers) else {}
+        values = {
+            "question": question,
+            "answer": ans_obj.get("answer", ""),
+            "score": evaluations[idx] if idx < len(evaluations) else None,
+            "flagged_script": bool(ans_obj.get("flagged", False))
+        }
+        if idx < len(existing):
+            for field, value in values.items():
+                setattr(existing[idx], field, value)
+        else:
+            new_rows.append(InterviewQuestion(session_id=session.id, **values))
+
+    db.session.add_all(new_rows)
+    session.summary = summary_data
+    session.summary_hash = summary_hash
+
+    # Fold into the user's rollup only the first time the session ends
+    if session.ended_at is None:
+        session.ended_at = datetime.utcnow()
+        update_user_rollup(
+            session.user_id, session, evaluations[:len(questions)],
+            [_stage_for_index(idx) for idx in range(len(questions))]
+        )
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
 
 # ===== Resume Upload =====
 @interview_bp.route("/upload_resume", methods=["POST"])
 @jwt_required()
 def upload_resume():
+    """
+    Accept a PDF resume and queue it for parsing and indexing.
+    Returns 202 with a job to poll at /upload_resume/<job_id>.
+    """
     user_id = int(get_jwt_identity())
     file = request.files.get("resume")
 
     if not file or not file.filename.lower().endswith(".pdf"):
         return jsonify({"error": "Please upload a valid PDF resume"}), 400
 
-    try:
-        with pdfplumber.open(file) as pdf:
-            text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-    except Exception as e:
-        print(f"Error in resume parsing: {str(e)}")
-        return jsonify({"error": "Failed to parse PDF resume"}), 500
-
-    user = User.query.get(user_id)
-    if not user:
+    pdf_bytes = file.read()
+    if not pdf_bytes:
+        return jsonify({"error": "Please upload a valid PDF resume"}), 400
+    if not User.query.get(user_id):
         return jsonify({"error": "User not found"}), 404
 
-    user.resume_text = text
-    db.session.commit()
+    job = submit_resume(current_app._get_current_object(), user_id, pdf_bytes)
+    return jsonify({
+        "message": "Resume received, processing",
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": url_for("interview.resume_job_status", job_id=job["job_id"]),
+    }), 202
+
+
+@interview_bp.route("/upload_resume/<job_id>", methods=["GET"])
+@jwt_required()
+def resume_job_status(job_id):
+    """Status of a resume ingestion job: queued, parsing, indexing, done, failed or superseded."""
+    job = get_job(job_id, int(get_jwt_identity()))
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
+
+# ===== Session History =====
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+def _encode_cursor(session):
+    return f"{session.started_at.isoformat()}_{session.id}"
+
+def _decode_cursor(cursor):
+    started_at, _, session_id = cursor.rpartition("_")
+    return datetime.fromisoformat(started_at), int(session_id)
+
+@interview_bp.route("/sessions", methods=["GET"])
+@jwt_required()
+def list_sessions():
+    """
+    Keyset-paginated session history, newest first.
+    Query params: limit, cursor (next_cursor from the previous page).
+    Two queries per page regardless of history size.
+    """
+    user_id = int(get_jwt_identity())
     try:
-        build_resume_index(user_id, text)
-    except Exception as e:
-        print(f"Error in build_resume_index: {str(e)}")
-        return jsonify({"error": "Failed to index resume"}), 500
+        limit = int(request.args.get("limit", HISTORY_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        after = _decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, HISTORY_MAX_PAGE_SIZE)
+
+    query = InterviewSession.query.filter(InterviewSession.user_id == user_id)
+    if after:
+        started_at, session_id = after
+        query = query.filter(or_(
+            InterviewSession.started_at < started_at,
+            and_(InterviewSession.started_at == started_at, InterviewSession.id < session_id)
+        ))
+    sessions = query.order_by(
+        InterviewSession.started_at.desc(), InterviewSession.id.desc()
+    ).limit(limit + 1).all()
+
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+
+    # Per-session counts in one grouped query instead of lazy-loading questions
+    counts = {}
+    if sessions:
+        counts = dict(
+            db.session.query(InterviewQuestion.session_id, func.count(InterviewQuestion.id))
+            .filter(InterviewQuestion.session_id.in_([s.id for s in sessions]))
+            .group_by(InterviewQuestion.session_id)
+            .all()
+        )
+
+    return jsonify({
+        "sessions": [{
+            "session_id": s.id,
+            "started_at": s.started_at.isoformat() if s.started_at else None,
+            "ended_at": s.ended_at.isoformat() if s.ended_at else None,
+            "question_count": counts.get(s.id, 0)
+        } for s in sessions],
+        "next_cursor": _encode_cursor(sessions[-1]) if has_more else None
+    })
 
-    return jsonify({"message": "Resume uploaded, parsed, and indexed successfully"})
\ No newline at end of file
+@interview_bp.route("/sessions/<int:session_id>", methods=["GET"])
+@jwt_required()
+def get_session_detail(session_id):
+    """One session's Q/A with stored evaluations (two queries)."""
+    user_id = int(get_jwt_identity())
+    session = InterviewSession.query.filter_by(id=session_id, user_id=user_id).first()
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+
+    questions = (
+        InterviewQuestion.query
+        .filter_by(session_id=session_id)
+        .order_by(InterviewQuestion.created_at, InterviewQuestion.id)
+        .all()
+    )
+
+    return jsonify({
+        "session_id": session.id,
+        "started_at": session.started_at.isoformat() if session.started_at else None,
+        "ended_at": session.ended_at.isoformat() if session.ended_at else None,
+        "questions": [{
+            "question": q.question,
+            "answer": q.answer,
+            "evaluation": q.score,
+            "flagged_script": q.flagged_script,
+            "created_at": q.created_at.isoformat() if q.created_at else None
+        } for q in questions]
+    })
+
+
+# ===== Performance Rollup =====
+@interview_bp.route("/performance", methods=["GET"])
+@jwt_required()
+def get_performance():
+    """Cross-session averages, verdict counts and recent trend (one PK lookup)."""
+    user_id = int(get_jwt_identity())
+    return jsonify(serialize_rollup(UserPerformance.query.get(user_id)))
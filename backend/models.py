@@ -21,17 +21,54 @@ class InterviewSession(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     ended_at = db.Column(db.DateTime)
+    summary = db.Column(db.JSON)  # Final summary JSON, written by /summary
+    summary_hash = db.Column(db.String(64))  # sha256 of the questions + evaluations it summarizes
+
+    # Session history is paged newest-first per user; also serves user_id lookups
+    __table_args__ = (
+        db.Index("ix_interview_sessions_user_started", "user_id", "started_at", "id"),
+    )
 
     questions = db.relationship("InterviewQuestion", backref="session", cascade="all, delete-orphan")
 
 class InterviewQuestion(db.Model):
     __tablename__ = "interview_questions"
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey("interview_sessions.id", ondelete="CASCADE"), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey("interview_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     question = db.Column(db.Text, nullable=False)
     answer = db.Column(db.Text)
     score = db.Column(db.JSON)  # Store evaluation JSON
     flagged_script = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class UserPerformance(db.Model):
+    """Per-user score rollup, updated incrementally as each session ends."""
+    __tablename__ = "user_performance"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    session_count = db.Column(db.Integer, default=0, nullable=False)
+    question_count = db.Column(db.Integer, default=0, nullable=False)
+    dimension_totals = db.Column(db.JSON, default=dict)  # {dimension: {"sum", "count"}}
+    stage_totals = db.Column(db.JSON, default=dict)      # {stage: {"sum", "count"}}
+    verdict_counts = db.Column(db.JSON, default=dict)    # {verdict: n}
+    recent_sessions = db.Column(db.JSON, default=list)   # last N {"session_id", "ended_at", "average"}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def upgrade_schema():
+    """
+    create_all() only creates missing tables, so add nullable columns and
+    indexes introduced since an existing database was created (idempotent).
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                    print(f"[DB] Added column {table.name}.{column.name}")
 
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -0,0 +1,77 @@
+# Cold-import profiler and startup budget check.
+#
+#   python profile_imports.py                 # top modules by cumulative import time
+#   python profile_imports.py --check         # exit 1 if `import app` is over budget
+#
+# Each run is a fresh interpreter with -X importtime, so nothing is cached
+# in sys.modules. --check also fails if any module in HEAVY_MODULES is
+# imported eagerly; they must load on first use (see utils/embeddings.py).
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1500))
+HEAVY_MODULES = ("torch", "sentence_transformers", "whisper", "faiss", "pdfplumber", "gtts", "pyttsx3")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_import(module):
+    """Import `module` in a fresh interpreter; returns {name: (self_ms, cumulative_ms)}."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile cold import time of the backend")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=3, help="report the median of this many cold imports")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--check", action="store_true", help="fail if over IMPORT_BUDGET_MS or heavy modules load")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    totals = [run[args.module][1] for run in runs]
+    total_ms = statistics.median(totals)
+    timings = runs[totals.index(total_ms)] if total_ms in totals else runs[-1]
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    top = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_ms, cumulative_ms) in top:
+        print(f"{cumulative_ms:>14.1f} {self_ms:>9.1f}  {name}")
+    print(f"\nimport {args.module}: median {total_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms")
+
+    if not args.check:
+        return 0
+
+    eager = sorted(m for m in HEAVY_MODULES if m in timings)
+    failed = False
+    if eager:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ Cold import of {args.module} is {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("✅ Within startup budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
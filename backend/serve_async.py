@@ -0,0 +1,37 @@
+# Cooperative server for the I/O-bound interview endpoints.
+#
+# /ask, /answer and /summary spend most of their time waiting on Gemini,
+# gTTS and Redis. gevent turns those socket waits into greenlet switches, so
+# one process can hold hundreds of in-flight interviews; CPU-bound work
+# (Whisper, embeddings) is pushed to OS threads via utils.concurrency.
+#
+#   python serve_async.py            # PORT, ASYNC_MAX_CONNECTIONS, CPU_WORKERS
+from gevent import monkey
+monkey.patch_all()
+
+# psycopg2 is a C extension; make its waits cooperative too if available
+try:
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+except ImportError:
+    pass
+
+import os
+from gevent import get_hub
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from app import app, init_db
+from utils.warmup import preload, warmup
+from utils.concurrency import CPU_WORKERS
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 5000))
+MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", 1000))
+
+if __name__ == "__main__":
+    get_hub().threadpool.maxsize = CPU_WORKERS
+    init_db()
+    preload()
+    warmup()
+    print(f"🚀 Serving on {HOST}:{PORT} (max {MAX_CONNECTIONS} connections, {CPU_WORKERS} CPU threads)")
+    WSGIServer((HOST, PORT), app, spawn=Pool(MAX_CONNECTIONS)).serve_forever()
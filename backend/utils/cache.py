@@ -1,56 +1,123 @@
-import redis
 import os
 import json
+import time
 import hashlib
-import faiss
-from urllib.parse import urlparse
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 from models import User
+from utils.cache_backend import create_cache_client, COMPARE_AND_DELETE
+from utils.metrics import TimedRedis
 
-# ===== Redis Connection =====
-redis_url = os.getenv("REDIS_URL")
-if redis_url:
-    url = urlparse(redis_url)
-    r = redis.Redis(
-        host=url.hostname,
-        port=url.port,
-        password=url.password,
-        ssl=True if url.scheme == "rediss" else False,
-        decode_responses=False
-    )
-else:
-    # Local fallback
-    r = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
-        port=int(os.getenv("REDIS_PORT", 6379)),
-        decode_responses=False
-    )
-
-# ===== Paths =====
-RESUME_DIR = "embeddings/resumes"
-os.makedirs(RESUME_DIR, exist_ok=True)
-
-# ===== Embedding Model =====
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# ===== Cache Connection =====
+# Redis with a bounded pool and timeouts, or the in-process backend
+# (CACHE_BACKEND=memory). Every module imports this `r`; each command's
+# round trip is recorded as the "redis" stage (see utils/metrics.py).
+r = TimedRedis(create_cache_client())
 
 # ===== Conversation Context =====
-def context_key(user_id, session_id):
-    return f"ctx:{user_id}:{session_id}"
-
-def load_context(user_id, session_id):
-    data = r.get(context_key(user_id, session_id))
-    return json.loads(data) if data else {
-        "topics": [],
-        "questions": [],
-        "sample_answers": [],
-        "evaluations": [],
-        "answers": [],
-        "question_count": 0,
-        "stage": "intro"
-    }
-
-def save_context(user_id, session_id, context, ttl=86400):
-    r.setex(context_key(user_id, session_id), ttl, json.dumps(context))
+# Stored per field instead of as one JSON blob so writers append instead of
+# rewriting everything (and stop overwriting each other):
+#   ctx:{user}:{session}            hash  -> stage, question_count, final_summary
+#   ctx:{user}:{session}:{list}     list  -> one JSON item per question/answer/...
+# Every value is JSON-encoded.
+CONTEXT_TTL = 86400
+CONTEXT_LISTS = ("topics", "questions", "sample_answers", "answers", "evaluations")
+CONTEXT_DEFAULTS = {"question_count": 0, "stage": "intro"}
+
+def context_key(user_id, session_id, field=None):
+    base = f"ctx:{user_id}:{session_id}"
+    return f"{base}:{field}" if field else base
+
+def context_keys(user_id, session_id):
+    """All Redis keys that make up one session context."""
+    return [context_key(user_id, session_id)] + [
+        context_key(user_id, session_id, name) for name in CONTEXT_LISTS
+    ]
+
+def _touch_context(pipe, user_id, session_id, ttl):
+    keys = context_keys(user_id, session_id)
+    for key in keys:
+        pipe.expire(key, ttl)
+    track_session_keys(pipe, user_id, session_id, keys, ttl)
+
+def init_context(user_id, session_id, ttl=CONTEXT_TTL):
+    """Reset a session context to its empty state."""
+    pipe = r.pipeline()
+    pipe.delete(*context_keys(user_id, session_id))
+    pipe.hset(context_key(user_id, session_id), mapping={
+        k: json.dumps(v) for k, v in CONTEXT_DEFAULTS.items()
+    })
+    pipe.expire(context_key(user_id, session_id), ttl)
+    track_session_keys(pipe, user_id, session_id, context_keys(user_id, session_id), ttl)
+    pipe.execute()
+
+def load_context(user_id, session_id, fields=None):
+    """
+    Fetch the session context in one round trip.
+    `fields` limits which scalar/list fields are read; default is everything.
+    """
+    wanted = set(fields) if fields else set(CONTEXT_LISTS) | set(CONTEXT_DEFAULTS) | {"final_summary"}
+    lists = [name for name in CONTEXT_LISTS if name in wanted]
+    scalars = [name for name in wanted if name not in CONTEXT_LISTS]
+
+    pipe = r.pipeline(transaction=False)
+    if scalars:
+        pipe.hmget(context_key(user_id, session_id), scalars)
+    for name in lists:
+        pipe.lrange(context_key(user_id, session_id, name), 0, -1)
+    results = pipe.execute()
+
+    context = {}
+    if scalars:
+        for name, raw in zip(scalars, results.pop(0)):
+            if raw is not None:
+                context[name] = json.loads(raw)
+            elif name in CONTEXT_DEFAULTS:
+                context[name] = CONTEXT_DEFAULTS[name]
+    for name, items in zip(lists, results):
+        context[name] = [json.loads(item) for item in items]
+    return context
+
+def append_context(user_id, session_id, ttl=CONTEXT_TTL, incr=None, fields=None, **items):
+    """
+    Atomically append one item to each named list (MULTI/EXEC), optionally
+    incrementing question_count and setting scalar `fields`, and refresh
+    the context TTL.
+    e.g. append_context(u, s, questions=q, sample_answers=a)
+    """
+    pipe = r.pipeline()
+    if fields:
+        pipe.hset(context_key(user_id, session_id), mapping={
+            k: json.dumps(v, ensure_ascii=False) for k, v in fields.items()
+        })
+    for name, item in items.items():
+        if name not in CONTEXT_LISTS:
+            raise KeyError(f"Unknown context list '{name}'")
+        pipe.rpush(context_key(user_id, session_id, name), json.dumps(item, ensure_ascii=False))
+    if incr:
+        pipe.hincrby(context_key(user_id, session_id), "question_count", incr)
+    _touch_context(pipe, user_id, session_id, ttl)
+    pipe.execute()
+
+def set_context_fields(user_id, session_id, ttl=CONTEXT_TTL, **fields):
+    """Overwrite scalar fields and/or whole lists in one transaction."""
+    pipe = r.pipeline()
+    scalars = {}
+    for name, value in fields.items():
+        if name in CONTEXT_LISTS:
+            key = context_key(user_id, session_id, name)
+            pipe.delete(key)
+            if value:
+                pipe.rpush(key, *[json.dumps(v, ensure_ascii=False) for v in value])
+        else:
+            scalars[name] = json.dumps(value, ensure_ascii=False)
+    if scalars:
+        pipe.hset(context_key(user_id, session_id), mapping=scalars)
+    _touch_context(pipe, user_id, session_id, ttl)
+    pipe.execute()
 
 # ===== Session-Aware Cache for LLM Outputs =====
 def get_cached_llm_result(prefix, prompt, session_id=None, ttl=3600):
@@ -67,24 +134,75 @@ def set_cached_llm_result(prefix, prompt, result, session_id=None, ttl=3600):
     key = f"{prefix}:{prompt_hash}"
     r.setex(key, ttl, result.encode())
 
-# ===== Anti-Script Detection =====
-def is_scripted_answer(candidate_answer, sample_answer, threshold=0.85):
-    """
-    Checks if candidate answer is too similar to sample answer.
-    Uses simple cosine similarity on hashed values for caching.
+# ===== Single-Flight Computation =====
+_RELEASE_LOCK = r.register_script(COMPARE_AND_DELETE)
+
+def single_flight(key, compute, ttl, lock_timeout=30, wait_timeout=None, poll_interval=0.05):
     """
-    from difflib import SequenceMatcher
+    Return the cached value at `key`, computing it at most once across
+    concurrent callers (processes included).
 
-    cache_key = f"script_check:{hashlib.md5((candidate_answer+sample_answer).encode()).hexdigest()}"
-    cached = r.get(cache_key)
-    if cached:
-        return cached.decode() == "true"
+    The first caller takes a Redis lock (SET NX PX) and runs compute();
+    others poll the cache until the value appears. The lock expires after
+    `lock_timeout` seconds, so a crashed holder can't block the key forever:
+    a waiter simply takes over the stale lock. If nothing shows up within
+    `wait_timeout` (default: lock_timeout), the waiter computes it itself.
 
-    ratio = SequenceMatcher(None, candidate_answer.lower(), sample_answer.lower()).ratio()
-    scripted = ratio >= threshold
+    compute() must return bytes; falsy results are returned but not cached.
+    """
+    cached = r.get(key)
+    if cached is not None:
+        return cached
 
-    r.setex(cache_key, 3600, b"true" if scripted else b"false")
-    return scripted
+    lock_key = f"lock:{key}"
+    token = uuid4().hex
+    deadline = time.time() + (wait_timeout if wait_timeout is not None else lock_timeout)
+
+    while True:
+        if r.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)):
+            try:
+                # Filled while we were waiting for the lock
+                cached = r.get(key)
+                if cached is not None:
+                    return cached
+                value = compute()
+                if value:
+                    r.setex(key, ttl, value)
+                return value
+            finally:
+                _RELEASE_LOCK(keys=[lock_key], args=[token])
+
+        time.sleep(poll_interval)
+        cached = r.get(key)
+        if cached is not None:
+            return cached
+
+        if time.time() > deadline:
+            print(f"[SINGLE-FLIGHT] Gave up waiting on {key}, computing locally")
+            value = compute()
+            if value:
+                r.setex(key, ttl, value)
+            return value
+
+@contextmanager
+def redis_lock(key, lock_timeout=30, wait_timeout=0, poll_interval=0.05):
+    """
+    Hold lock:{key} (SET NX PX) for the block; yields True if acquired.
+    Waits up to `wait_timeout` seconds, then yields False so the caller can
+    decide whether to skip the work. Released only by its owner.
+    """
+    lock_key = f"lock:{key}"
+    token = uuid4().hex
+    deadline = time.time() + wait_timeout
+    acquired = bool(r.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+    while not acquired and time.time() < deadline:
+        time.sleep(poll_interval)
+        acquired = bool(r.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _RELEASE_LOCK(keys=[lock_key], args=[token])
 
 # ===== TTS/STT Caching =====
 def get_cached_audio(key):
@@ -100,101 +218,220 @@ def get_cached_transcription(audio_hash):
 def set_cached_transcription(audio_hash, text, ttl=3600):
     r.setex(f"stt:{audio_hash}", ttl, text.encode())
 
-# ===== Resume Caching & Embeddings =====
-def get_resume_text(user_id):
-    """
-    Fetch resume text from Redis first, then DB if missing.
-    Cache it in Redis for 24 hours.
-    """
-    key = f"resume:{user_id}"
-    data = r.get(key)
-    if data:
-        return data.decode()
+# ===== Two-Tier Cache (in-process LRU -> Redis -> loader) =====
+INVALIDATION_CHANNEL = "cache:invalidate"
+_two_tier_caches = {}
+_invalidation_listener = None
+_invalidation_lock = threading.Lock()
+
+def _listen_for_invalidations():
+    """Evict local entries when any process publishes an invalidation."""
+    while True:
+        try:
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            for message in pubsub.listen():
+                name, _, key = message["data"].decode().partition("|")
+                cache = _two_tier_caches.get(name)
+                if cache:
+                    cache.evict_local(key)
+        except Exception as e:
+            print(f"[CACHE] Invalidation listener error: {e}, reconnecting")
+            time.sleep(1)
+
+def _ensure_invalidation_listener():
+    global _invalidation_listener
+    if _invalidation_listener is not None:
+        return
+    with _invalidation_lock:
+        if _invalidation_listener is None:
+            _invalidation_listener = threading.Thread(
+                target=_listen_for_invalidations, name="cache-invalidation", daemon=True
+            )
+            _invalidation_listener.start()
+
+def _reset_listener_after_fork():
+    # Threads don't survive fork(): under a preloading server the master's
+    # listener is gone in every worker, so the next cache access starts one.
+    global _invalidation_listener, _invalidation_lock
+    _invalidation_listener = None
+    _invalidation_lock = threading.Lock()
 
-    user = User.query.get(user_id)
-    if user and user.resume_text:
-        r.setex(key, 86400, user.resume_text)
-        return user.resume_text
-    return None
+os.register_at_fork(after_in_child=_reset_listener_after_fork)
 
-def store_resume_embedding(user_id, resume_text):
+
+class TwoTierCache:
     """
-    Store per-user FAISS index for resume lines.
+    Bounded in-process LRU in front of Redis for small, read-mostly values
+    that are read repeatedly within one interview (resume text, rewrites).
+
+    Values are bytes. Local entries expire after `local_ttl` seconds and the
+    LRU is capped at `max_bytes`; Redis entries use `redis_ttl`. invalidate()
+    deletes the Redis copy and publishes on INVALIDATION_CHANNEL so every
+    process drops its local copy.
     """
-    index_path = os.path.join(RESUME_DIR, f"{user_id}.faiss")
-    data_path = os.path.join(RESUME_DIR, f"{user_id}.json")
 
-    if os.path.exists(index_path) and os.path.exists(data_path):
-        return  # already stored
+    def __init__(self, name, local_ttl=300, redis_ttl=86400, max_bytes=8 * 1024 * 1024):
+        self.name = name
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        _two_tier_caches[name] = self
+        _ensure_invalidation_listener()
+
+    def redis_key(self, key):
+        return f"{self.name}:{key}"
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.time() + self.local_ttl, value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._pop(oldest)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def evict_local(self, key):
+        with self._lock:
+            self._pop(str(key))
+
+    def get(self, key, loader=None):
+        """Return the value from memory, then Redis, then loader() (caching it in both)."""
+        key = str(key)
+        _ensure_invalidation_listener()
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        value = r.get(self.redis_key(key))
+        if value is None and loader is not None:
+            value = loader()
+            if isinstance(value, str):
+                value = value.encode()
+            if value:
+                r.setex(self.redis_key(key), self.redis_ttl, value)
+
+        if value:
+            self._set_local(key, value)
+        return value
+
+    def set(self, key, value):
+        key = str(key)
+        if isinstance(value, str):
+            value = value.encode()
+        r.setex(self.redis_key(key), self.redis_ttl, value)
+        self.invalidate_local_everywhere(key)
+        self._set_local(key, value)
+
+    def invalidate(self, key):
+        key = str(key)
+        r.delete(self.redis_key(key))
+        self.invalidate_local_everywhere(key)
+
+    def invalidate_local_everywhere(self, key):
+        self.evict_local(key)
+        r.publish(INVALIDATION_CHANNEL, f"{self.name}|{key}")
 
-    sentences = [line.strip() for line in resume_text.split("\n") if line.strip()]
-    if not sentences:
-        return
 
-    embeddings = model.encode(sentences, convert_to_numpy=True)
+# ===== Resume Caching & Embeddings =====
+resume_cache = TwoTierCache("resume")
+
+def get_resume_text(user_id):
+    """
+    Fetch resume text from memory/Redis first, then DB if missing.
+    Cache it in Redis for 24 hours.
+    """
+    def load_from_db():
+        user = User.query.get(user_id)
+        return user.resume_text if user and user.resume_text else None
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+    data = resume_cache.get(user_id, loader=load_from_db)
+    return data.decode() if data else None
 
-    faiss.write_index(index, index_path)
-    with open(data_path, "w", encoding="utf-8") as f:
-        json.dump([{"id": i, "question": s, "answer": ""} for i, s in enumerate(sentences)], f)
+def invalidate_resume_text(user_id):
+    """Call after the stored resume changes so no process serves the old text."""
+    resume_cache.invalidate(user_id)
 
 # ===== Session Cleanup =====
-def cleanup_session_cache(user_id, session_id, keep_fields=None):
-    """
-    Deletes all cached data for a given session except specified keys.
-    Decodes Redis keys to str before matching, to avoid TypeError.
-    """
-    if keep_fields is None:
-        keep_fields = []
-
-    # Delete session context
-    r.delete(f"ctx:{user_id}:{session_id}")
-
-    # Helper: check if key should be kept
-    def should_keep(key):
-        key_str = key.decode() if isinstance(key, bytes) else key
-        return any(field in key_str for field in keep_fields)
-
-    # Delete followup question caches
-    for key in r.scan_iter(f"followup:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-
-    # Delete evaluation caches
-    for key in r.scan_iter(f"eval:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-
-    # Delete generated questions & sample answers
-    for key in r.scan_iter(f"questions:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-    for key in r.scan_iter(f"sample_answers:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-
-    # Delete any TTS/STT audio for this session
-    for key in r.scan_iter(f"stt:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-    for key in r.scan_iter(f"tts:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-
-    # Delete any cached audio for this session
-    for key in r.scan_iter(f"audio:{user_id}:{session_id}:*"):
-        if not should_keep(key):
-            r.delete(key)
-
-def get_all_cached_evaluations(user_id, session_id):
-        keys = r.keys(f"evaluation:{user_id}:{session_id}:*")
-        evals = []
-        for k in keys:
-            try:
-                evals.append(json.loads(r.get(k)))
-            except:
-                pass
-        return evals
-        
+# Every per-session key is registered in session_keys:{user}:{session} in the
+# same pipeline that writes it, so cleanup only touches this session's keys
+# instead of SCANning the whole keyspace.
+_cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-cleanup")
+
+def session_index_key(user_id, session_id):
+    return f"session_keys:{user_id}:{session_id}"
+
+def track_session_keys(pipe, user_id, session_id, keys, ttl=86400):
+    """Queue SADD of `keys` into the session index on `pipe` (a pipeline or r)."""
+    index_key = session_index_key(user_id, session_id)
+    pipe.sadd(index_key, *keys)
+    pipe.expire(index_key, ttl)
+
+def _unlink_session_keys(user_id, session_id):
+    index_key = session_index_key(user_id, session_id)
+    members = [m.decode() if isinstance(m, bytes) else m for m in r.smembers(index_key)]
+    keys = set(context_keys(user_id, session_id)) | set(members)
+    r.unlink(*keys, index_key)
+    return len(keys)
+
+def cleanup_session_cache(user_id, session_id, defer=False):
+    """
+    Deletes every cached key of a session: its context, evaluations hash and
+    stream buffers. Call it only once the results are in the database.
+    Cost is proportional to the session's own key count.
+    With defer=True the UNLINK runs on a background thread.
+    """
+    if defer:
+        return _cleanup_executor.submit(_unlink_session_keys, user_id, session_id)
+    return _unlink_session_keys(user_id, session_id)
+
+# ===== Per-Session Evaluations =====
+# One hash per session, field = question index, so reading every evaluation
+# is a single HGETALL in question order (no KEYS scan of the keyspace).
+def evaluations_key(user_id, session_id):
+    return f"evaluation:{user_id}:{session_id}"
+
+def store_evaluation(user_id, session_id, index, evaluation, ttl=86400):
+    pipe = r.pipeline()
+    pipe.hset(evaluations_key(user_id, session_id), str(index), json.dumps(evaluation, ensure_ascii=False))
+    pipe.expire(evaluations_key(user_id, session_id), ttl)
+    track_session_keys(pipe, user_id, session_id, [evaluations_key(user_id, session_id)], ttl)
+    pipe.execute()
+
+def get_all_cached_evaluations(user_id, session_id, count=None):
+    """
+    Return evaluations ordered by question index. With `count`, the list has
+    exactly `count` slots and unanswered/failed questions are None.
+    """
+    evals = {}
+    for field, raw in r.hgetall(evaluations_key(user_id, session_id)).items():
+        try:
+            evals[int(field)] = json.loads(raw)
+        except Exception as e:
+            print(f"Error reading cached evaluation: {e}")
+
+    if count is None:
+        return [evals[i] for i in sorted(evals)]
+    return [evals.get(i) for i in range(count)]
@@ -0,0 +1,402 @@
+import time
+import queue
+import fnmatch
+import threading
+from urllib.parse import urlparse
+import redis
+from config import Config
+
+# ===== Shared Lua Scripts =====
+# The in-memory backend carries a Python twin for each script below, so code
+# using register_script() runs unchanged on either backend.
+COMPARE_AND_DELETE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# ===== Redis Backend =====
+def create_redis_client():
+    """
+    Redis client with an explicit, bounded connection pool and timeouts so a
+    slow or unreachable Redis fails fast instead of stalling every worker.
+    """
+    options = dict(
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+        decode_responses=False,
+    )
+    if Config.REDIS_URL:
+        url = urlparse(Config.REDIS_URL)
+        if url.scheme == "rediss":
+            options["connection_class"] = redis.SSLConnection
+        pool = redis.BlockingConnectionPool(
+            host=url.hostname,
+            port=url.port,
+            password=url.password,
+            timeout=Config.REDIS_POOL_TIMEOUT,
+            **options
+        )
+    else:
+        pool = redis.BlockingConnectionPool(
+            host=Config.REDIS_HOST,
+            port=Config.REDIS_PORT,
+            timeout=Config.REDIS_POOL_TIMEOUT,
+            **options
+        )
+    return redis.Redis(connection_pool=pool)
+
+
+# ===== In-Memory Backend =====
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+
+def _to_key(key):
+    return key.decode() if isinstance(key, bytes) else str(key)
+
+
+class _MemoryPubSub:
+    def __init__(self, backend, ignore_subscribe_messages=False):
+        self.backend = backend
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels):
+        with self.backend._lock:
+            for channel in channels:
+                self.channels.add(_to_key(channel))
+                self.backend._subscribers.setdefault(_to_key(channel), []).append(self)
+
+    def get_message(self, timeout=0):
+        try:
+            return self.messages.get(timeout=timeout) if timeout else self.messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+    def close(self):
+        with self.backend._lock:
+            for channel in self.channels:
+                subs = self.backend._subscribers.get(channel, [])
+                if self in subs:
+                    subs.remove(self)
+
+
+class _MemoryPipeline:
+    """Buffers commands and runs them under the backend lock, i.e. atomically."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+
+        def queue_command(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self):
+        with self.backend._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.commands = []
+
+
+class InMemoryRedis:
+    """
+    Single-process stand-in for the subset of redis-py used by this app
+    (strings, lists, hashes, sets, TTLs, pipelines, pub/sub and the scripts
+    above). For single-node deployments, benchmarks and load tests.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._subscribers = {}
+        self._lock = threading.RLock()
+        self._scripts = {
+            COMPARE_AND_DELETE.strip(): self._compare_and_delete,
+        }
+
+    # --- keyspace ---
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _get(self, key, default=None):
+        key = _to_key(key)
+        return self._data[key] if self._alive(key) else default
+
+    def _store(self, key, value):
+        key = _to_key(key)
+        if not self._alive(key):
+            self._expires.pop(key, None)
+        self._data[key] = value
+        return value
+
+    def ping(self):
+        return True
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for k in keys if self._alive(_to_key(k)))
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                key = _to_key(key)
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    unlink = delete
+
+    def expire(self, key, seconds):
+        with self._lock:
+            key = _to_key(key)
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.time() + seconds
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            key = _to_key(key)
+            if not self._alive(key):
+                return -2
+            if key not in self._expires:
+                return -1
+            return int(self._expires[key] - time.time())
+
+    def keys(self, pattern="*"):
+        with self._lock:
+            pattern = _to_key(pattern)
+            return [k.encode() for k in list(self._data) if self._alive(k) and fnmatch.fnmatchcase(k, pattern)]
+
+    def scan_iter(self, match="*", count=None):
+        return iter(self.keys(match))
+
+    def flushall(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+
+    # --- strings ---
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def mget(self, keys, *args):
+        with self._lock:
+            return [self._get(k) for k in ([keys] if isinstance(keys, (str, bytes)) else list(keys)) + list(args)]
+
+    def set(self, key, value, ex=None, px=None, nx=False, xx=False):
+        with self._lock:
+            exists = self._alive(_to_key(key))
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._data[_to_key(key)] = _to_bytes(value)
+            self._expires.pop(_to_key(key), None)
+            if ex is not None:
+                self._expires[_to_key(key)] = time.time() + ex
+            elif px is not None:
+                self._expires[_to_key(key)] = time.time() + px / 1000
+            return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    def incr(self, key, amount=1):
+        return self.incrby(key, amount)
+
+    def incrby(self, key, amount=1):
+        with self._lock:
+            value = int(self._get(key, b"0")) + amount
+            self._store(key, _to_bytes(value))
+            return value
+
+    # --- lists ---
+    def rpush(self, key, *values):
+        with self._lock:
+            items = self._get(key) or self._store(key, [])
+            items.extend(_to_bytes(v) for v in values)
+            return len(items)
+
+    def lpop(self, key):
+        with self._lock:
+            items = self._get(key)
+            if not items:
+                return None
+            value = items.pop(0)
+            if not items:
+                self.delete(key)
+            return value
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            items = self._get(key, [])
+            end = len(items) if end == -1 else end + 1
+            return list(items[start:end])
+
+    def lindex(self, key, index):
+        with self._lock:
+            items = self._get(key, [])
+            try:
+                return items[index]
+            except IndexError:
+                return None
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._get(key, []))
+
+    # --- hashes ---
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            table = self._get(key)
+            if table is None:
+                table = self._store(key, {})
+            pairs = dict(mapping or {})
+            if field is not None:
+                pairs[field] = value
+            added = 0
+            for f, v in pairs.items():
+                f = _to_bytes(f)
+                added += f not in table
+                table[f] = _to_bytes(v)
+            return added
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._get(key, {}).get(_to_bytes(field))
+
+    def hmget(self, key, fields, *args):
+        with self._lock:
+            table = self._get(key, {})
+            fields = ([fields] if isinstance(fields, (str, bytes)) else list(fields)) + list(args)
+            return [table.get(_to_bytes(f)) for f in fields]
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._get(key, {}))
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            table = self._get(key, {})
+            return sum(1 for f in fields if table.pop(_to_bytes(f), None) is not None)
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            value = int(self.hget(key, field) or 0) + amount
+            self.hset(key, field, value)
+            return value
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        with self._lock:
+            value = float(self.hget(key, field) or 0) + amount
+            self.hset(key, field, value)
+            return value
+
+    # --- sets ---
+    def sadd(self, key, *members):
+        with self._lock:
+            members_set = self._get(key)
+            if members_set is None:
+                members_set = self._store(key, set())
+            before = len(members_set)
+            members_set.update(_to_bytes(m) for m in members)
+            return len(members_set) - before
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._get(key, set()))
+
+    def srem(self, key, *members):
+        with self._lock:
+            members_set = self._get(key, set())
+            before = len(members_set)
+            members_set.difference_update(_to_bytes(m) for m in members)
+            return before - len(members_set)
+
+    # --- pub/sub ---
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(_to_key(channel), []))
+        for sub in subscribers:
+            sub.messages.put({"type": "message", "channel": _to_bytes(channel), "data": _to_bytes(message)})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _MemoryPubSub(self, ignore_subscribe_messages)
+
+    # --- pipelines & scripts ---
+    def pipeline(self, transaction=True):
+        return _MemoryPipeline(self)
+
+    def register_script(self, script):
+        impl = self._scripts.get(script.strip())
+        if impl is None:
+            raise NotImplementedError("Script has no in-memory implementation")
+
+        def run(keys=(), args=(), client=None):
+            with self._lock:
+                return impl(list(keys), list(args))
+        return run
+
+    def _compare_and_delete(self, keys, args):
+        if self._get(keys[0]) == _to_bytes(args[0]):
+            return self.delete(keys[0])
+        return 0
+
+
+# ===== Factory =====
+def create_cache_client():
+    """Return the cache client selected by Config.CACHE_BACKEND ("redis" or "memory")."""
+    backend = Config.CACHE_BACKEND.lower()
+    if backend == "memory":
+        print("[CACHE] Using in-process memory backend")
+        return InMemoryRedis()
+    if backend != "redis":
+        raise ValueError(f"Unknown CACHE_BACKEND '{backend}', expected 'redis' or 'memory'")
+    return create_redis_client()
+
+
+def check_cache_health(client):
+    """Round-trip PING with the client's timeouts; returns (ok, latency_ms)."""
+    start = time.perf_counter()
+    try:
+        ok = bool(client.ping())
+    except Exception as e:
+        print(f"[CACHE] Health check failed: {e}")
+        ok = False
+    return ok, (time.perf_counter() - start) * 1000
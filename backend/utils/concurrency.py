@@ -0,0 +1,26 @@
+import os
+
+# OS threads for CPU-bound work (Whisper, sentence embeddings, FAISS)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", os.cpu_count() or 2))
+
+
+def cooperative_server():
+    """True when running under serve_async.py (gevent-patched sockets)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """
+    Run CPU-heavy work on a real OS thread.
+    Under the cooperative server the calling greenlet yields until it is done,
+    so other in-flight interviews keep being served while Whisper or the
+    embedding model runs; under a plain sync server this is a direct call.
+    """
+    if cooperative_server():
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
@@ -0,0 +1,27 @@
+import os
+import threading
+
+# ===== Sentence Embeddings =====
+# One SentenceTransformer per process, loaded on first use: importing
+# sentence_transformers pulls in torch, which dominates cold start, and
+# processes that only serve /api/auth never need it.
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the embedding model once per process and share it across requests."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+
+def encode(texts):
+    """Embed a list of strings as a float32 numpy matrix."""
+    return get_embedding_model().encode(texts, convert_to_numpy=True)
@@ -1,12 +1,15 @@
 import os
 import json
-import faiss
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from models import User
 from flask import current_app
+from utils.concurrency import run_cpu_bound
+from utils.embeddings import encode
+from utils.metrics import timed
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# faiss is imported where it is used so that importing this module (and
+# therefore the app) doesn't load the native library.
 
 # --- Question Bank Index ---
 QUESTION_INDEX_PATH = "embeddings/question_index.faiss"
@@ -15,52 +18,30 @@ QUESTION_DATA_PATH = "embeddings/question_data.json"
 def load_question_index():
     if not os.path.exists(QUESTION_INDEX_PATH) or not os.path.exists(QUESTION_DATA_PATH):
         return None, []
+    import faiss
     index = faiss.read_index(QUESTION_INDEX_PATH)
     with open(QUESTION_DATA_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
     return index, data
 
-question_index, question_data = load_question_index()
+_question_bank = None
+_question_bank_lock = threading.Lock()
+
+def get_question_index():
+    """Load the question bank index once per process; returns (index, data)."""
+    global _question_bank
+    if _question_bank is None:
+        with _question_bank_lock:
+            if _question_bank is None:
+                _question_bank = load_question_index()
+    return _question_bank
 
 def search_questions(query, k=3):
+    question_index, question_data = get_question_index()
     if not question_index:
         return []
-    vec = model.encode([query], convert_to_numpy=True)
-    D, I = question_index.search(vec, k)
+    with timed("embed"):
+        vec = run_cpu_bound(encode, [query])
+    with timed("faiss", index="questions"):
+        D, I = run_cpu_bound(question_index.search, vec, k)
     return [question_data[i] for i in I[0] if i < len(question_data)]
-
-# --- Resume Index ---
-RESUME_INDEX_DIR = "embeddings/resumes"
-os.makedirs(RESUME_INDEX_DIR, exist_ok=True)
-
-def build_resume_index(user_id, resume_text):
-    """Create or overwrite FAISS index for this user's resume"""
-    user_dir = os.path.join(RESUME_INDEX_DIR, str(user_id))
-    os.makedirs(user_dir, exist_ok=True)
-
-    sentences = [s.strip() for s in resume_text.split("\n") if s.strip()]
-    embeddings = model.encode(sentences, convert_to_numpy=True)
-
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
-
-    faiss.write_index(index, os.path.join(user_dir, "resume_index.faiss"))
-    with open(os.path.join(user_dir, "resume_data.json"), "w", encoding="utf-8") as f:
-        json.dump([{"question": s} for s in sentences], f, ensure_ascii=False, indent=2)
-
-def search_resume(user_id, query, k=3):
-    """Search inside a user's resume FAISS index"""
-    user_dir = os.path.join(RESUME_INDEX_DIR, str(user_id))
-    idx_path = os.path.join(user_dir, "resume_index.faiss")
-    data_path = os.path.join(user_dir, "resume_data.json")
-
-    if not os.path.exists(idx_path) or not os.path.exists(data_path):
-        return []
-
-    index = faiss.read_index(idx_path)
-    with open(data_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    vec = model.encode([query], convert_to_numpy=True)
-    D, I = index.search(vec, k)
-    return [data[i] for i in I[0] if i < len(data)]
\ No newline at end of file
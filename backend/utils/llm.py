@@ -1,9 +1,14 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
 import json
-from utils.cache import load_context, r, get_resume_text, save_context
+from utils.cache import load_context, r, get_resume_text, append_context, track_session_keys, TwoTierCache
 from config import Config
 from utils.faiss_index import search_questions
+from utils.metrics import timed
+from utils.recorder import external_call
+from utils.llm_scheduler import get_scheduler, INTERACTIVE, BACKGROUND
 import time
 
 # ===== API Key Rotator =====
@@ -63,6 +68,9 @@ key_rotator = APIKeyRotator([
     Config.GEMINI_API_KEY14
 ])
 
+# Rewrites of bank questions are shared by every candidate who draws them
+rewrite_cache = TwoTierCache("rewrite", local_ttl=3600, redis_ttl=7 * 86400)
+
 # ===== PROMPTS =====
 
 QUESTION_PROMPT = """
@@ -146,33 +154,64 @@ JSON only:
 
 
 # ===== Gemini API Call =====
-def _call_gemini(prompt, key_rotator):
+# One keep-alive session shared by all requests; the pool is sized for many
+# concurrent calls under the cooperative server.
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", 100))
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=GEMINI_POOL_SIZE))
+_http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=GEMINI_POOL_SIZE))
+
+def _call_gemini(prompt, key_rotator, priority=INTERACTIVE, user_id=None):
+    # Recorded / served from a recording when session record-replay is on
+    return external_call("gemini", lambda: _request_gemini(prompt, key_rotator, priority, user_id))
+
+
+def _request_gemini(prompt, key_rotator, priority=INTERACTIVE, user_id=None):
+    # Each attempt waits for a key slot in the scheduler (see utils/llm_scheduler.py)
+    scheduler = get_scheduler(key_rotator)
     for _ in range(len(key_rotator.api_keys)):
-        api_key = key_rotator.get_key()
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent?key={api_key}"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {"temperature": 0.4, "maxOutputTokens": 1500}
-        }
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=10)
-            if resp.status_code == 403 or resp.status_code == 429:
-                # Quota exceeded or auth issue → mark failed and try next key
+        with scheduler.slot(priority, user_id) as api_key:
+            url = f"{Config.GEMINI_BASE_URL}/v1beta/models/gemini-2.0-flash-lite:generateContent?key={api_key}"
+            headers = {"Content-Type": "application/json"}
+            payload = {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"temperature": 0.4, "maxOutputTokens": 1500}
+            }
+            # Each attempt is timed separately, labelled by key slot and outcome
+            slot = key_rotator.api_keys.index(api_key)
+            try:
+                with timed("gemini", key_slot=slot) as span:
+                    resp = _http.post(url, headers=headers, json=payload, timeout=10)
+                    span["status"] = str(resp.status_code)
+                    if resp.status_code == 403 or resp.status_code == 429:
+                        # Quota exceeded or auth issue → mark failed and try next key
+                        key_rotator.mark_key_failed(api_key)
+                        continue
+                    resp.raise_for_status()
+                    return resp.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
+            except Exception as e:
+                print(f"[Gemini ERROR] Key {api_key} failed: {e}")
                 key_rotator.mark_key_failed(api_key)
                 continue
-            resp.raise_for_status()
-            return resp.json()["candidates"][0]["content"]["parts"][0]["text"].strip()
-        except Exception as e:
-            print(f"[Gemini ERROR] Key {api_key} failed: {e}")
-            key_rotator.mark_key_failed(api_key)
-            continue
     raise RuntimeError("All API keys failed or expired.")
 
 
+def strip_code_fences(raw):
+    """Drop the ```json fences Gemini sometimes wraps its JSON in."""
+    cleaned = (raw or "").strip()
+    if cleaned.startswith("```"):
+        cleaned = "\n".join(line for line in cleaned.splitlines() if not line.strip().startswith("```"))
+    return cleaned
+
+
+def parse_llm_json(raw):
+    """Parse a JSON reply from the model; raises json.JSONDecodeError if it isn't JSON."""
+    return json.loads(strip_code_fences(raw))
+
+
 # ===== PUBLIC FUNCTIONS =====
 def generate_followup(user_id, user_context, base_question, sample_answer, session_id):
-    context = load_context(user_id, session_id)
+    context = load_context(user_id, session_id, fields=("questions", "answers"))
     resume_text = get_resume_text(user_id) or ""
 
     previous_questions = context.get("questions", [])
@@ -216,11 +255,14 @@ so it is at most 1–2 lines, asks only ONE thing, and is clear.
 
 Original Question: {faiss_question}
 """
-        tweaked_question = _call_gemini(tweak_prompt, key_rotator).strip() or faiss_question
+        rewrite_key = hashlib.md5(faiss_question.encode()).hexdigest()
+        tweaked_question = rewrite_cache.get(
+            rewrite_key,
+            loader=lambda: _call_gemini(tweak_prompt, key_rotator, user_id=user_id).strip()
+        )
+        tweaked_question = tweaked_question.decode() if tweaked_question else faiss_question
 
-        context["questions"].append(tweaked_question)
-        context["sample_answers"].append(faiss_answer)
-        save_context(user_id, session_id, context)
+        append_context(user_id, session_id, questions=tweaked_question, sample_answers=faiss_answer)
         return tweaked_question
 
     # ✅ For intro, resume, hr — use LLM with cross-questioning
@@ -235,13 +277,14 @@ Original Question: {faiss_question}
 
     cache_key = f"followup:{user_id}:{session_id}:{stage}"
     r.delete(cache_key)  # Force fresh generation
-    question = _call_gemini(prompt, key_rotator).strip()
-    r.setex(cache_key, 3600, question.encode())
+    question = _call_gemini(prompt, key_rotator, user_id=user_id).strip()
+    pipe = r.pipeline()
+    pipe.setex(cache_key, 3600, question.encode())
+    track_session_keys(pipe, user_id, session_id, [cache_key])
+    pipe.execute()
 
-    context["questions"].append(question)
     # Preserve provided sample answer if available
-    context["sample_answers"].append(sample_answer or "")
-    save_context(user_id, session_id, context)
+    append_context(user_id, session_id, questions=question, sample_answers=sample_answer or "")
 
     return question
 
@@ -255,15 +298,11 @@ def generate_evaluation(question, candidate_answer, sample_answer, stage, resume
         resume_text=resume_text
     )
 
-    raw_output = _call_gemini(prompt, key_rotator)
+    raw_output = _call_gemini(prompt, key_rotator, priority=INTERACTIVE)
 
     # Try to parse JSON safely
     try:
-        # Remove ```json ``` fences if present
-        cleaned = raw_output.strip()
-        if cleaned.startswith("```"):
-            cleaned = "\n".join(line for line in cleaned.splitlines() if not line.strip().startswith("```"))
-        return json.loads(cleaned)
+        return parse_llm_json(raw_output)
     except Exception as e:
         print(f"[Evaluation JSON Parse Error] {e} | Raw: {raw_output}")
         return {
@@ -290,15 +329,10 @@ def generate_summary(questions, evaluations):
         evaluations=json.dumps(evaluations, ensure_ascii=False)
     )
 
-    summary_raw = _call_gemini(prompt, key_rotator)
+    summary_raw = _call_gemini(prompt, key_rotator, priority=BACKGROUND)
 
     # Clean ```json fences if present
-    cleaned = summary_raw.strip()
-    if cleaned.startswith("```"):
-        cleaned = "\n".join(
-            line for line in cleaned.splitlines()
-            if not line.strip().startswith("```")
-        )
+    cleaned = strip_code_fences(summary_raw)
 
     # Try to parse JSON
     try:
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+from utils.metrics import observe
+
+# ===== LLM Call Scheduler =====
+# Every Gemini attempt waits here for a key slot, so a burst of end-of-session
+# summaries can't starve candidates in the middle of an interview.
+#   - Priority classes: "interactive" (calls that gate the candidate's next
+#     step: question generation on /ask including the technical rewrite, and
+#     the answer evaluation run inside /answer) always goes first;
+#     "background" (the once-per-session summary, which is single-flighted
+#     and cached) may only fill GEMINI_BACKGROUND_SHARE of the slots, so
+#     interactive calls keep headroom.
+#   - Per-user fairness: within a class, waiters are served round-robin by
+#     user (start-time fair queueing), so one user's burst of calls can't
+#     delay other users by more than one turn each.
+#   - At most GEMINI_KEY_CONCURRENCY calls in flight per key. Keys in quota
+#     cooldown don't count, so capacity shrinks under 429s and background work
+#     is squeezed out before interactive work.
+# Limits are per worker process. Wait times are recorded as the "llm_queue"
+# stage; queue depth and in-flight counts are published to Redis every second
+# for /metrics.
+GEMINI_KEY_CONCURRENCY = int(os.getenv("GEMINI_KEY_CONCURRENCY", 4))
+GEMINI_BACKGROUND_SHARE = float(os.getenv("GEMINI_BACKGROUND_SHARE", 0.75))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", 30))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1}
+
+SCHEDULER_METRICS_KEY = "metrics:llm_scheduler"
+SNAPSHOT_MAX_AGE = 300  # seconds; older per-process snapshots are from dead workers
+PUBLISH_INTERVAL = 1
+
+
+class LLMScheduler:
+    def __init__(self, rotator, per_key=GEMINI_KEY_CONCURRENCY,
+                 background_share=GEMINI_BACKGROUND_SHARE, timeout=GEMINI_QUEUE_TIMEOUT):
+        self.rotator = rotator
+        self.per_key = per_key
+        self.background_share = background_share
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._key_inflight = {}    # key -> calls in flight
+        self._inflight = {p: 0 for p in PRIORITIES}
+        self._waiting = []         # waiters in arrival order
+        self._user_tag = {}        # (user, class) -> fair-queueing tag of their latest waiter
+        self._virtual_time = 0     # tag of the last granted waiter
+        self._seq = itertools.count()
+        self._dirty = False
+        self._publisher_pid = None
+
+    # ----- Admission -----
+    def _capacity(self):
+        available = [k for k in self.rotator.api_keys if self.rotator._is_key_available(k)]
+        return len(available) * self.per_key
+
+    def _limit(self, priority, capacity):
+        if priority == INTERACTIVE:
+            return capacity
+        return max(1, int(capacity * self.background_share)) if capacity else 0
+
+    def _free_key(self):
+        """Next key in rotation with a free slot, or None."""
+        for _ in range(len(self.rotator.api_keys)):
+            key = self.rotator.get_key()  # raises when every key is in cooldown
+            if self._key_inflight.get(key, 0) < self.per_key:
+                return key
+        return None
+
+    def _grant(self, waiter):
+        """Give `waiter` a key if it is next in line and a slot is free."""
+        capacity = self._capacity()
+        if not capacity:
+            raise RuntimeError("No API keys available (all in cooldown).")
+        total = sum(self._inflight.values())
+        eligible = [w for w in self._waiting if total < self._limit(w["priority"], capacity)]
+        if not eligible:
+            return None
+        head = min(eligible, key=lambda w: (
+            PRIORITIES[w["priority"]], w["tag"], w["seq"]))
+        if head is not waiter:
+            return None
+        key = self._free_key()
+        if key is None:
+            return None
+        self._key_inflight[key] = self._key_inflight.get(key, 0) + 1
+        self._inflight[waiter["priority"]] += 1
+        self._virtual_time = max(self._virtual_time, waiter["tag"])
+        return key
+
+    def acquire(self, priority, user):
+        """Block until a key slot is granted; returns the key."""
+        waiter = {"priority": priority, "user": user, "seq": next(self._seq)}
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        status = "ok"
+        try:
+            with self._cond:
+                # A user's next call queues one turn behind their previous one
+                tag = max(self._virtual_time, self._user_tag.get((user, priority), 0)) + 1
+                waiter["tag"] = self._user_tag[(user, priority)] = tag
+                self._waiting.append(waiter)
+                self._changed()
+                try:
+                    while True:
+                        key = self._grant(waiter)
+                        if key:
+                            return key
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            status = "timeout"
+                            raise RuntimeError(f"Timed out waiting {self.timeout:.0f}s for a Gemini key slot")
+                        # Re-check periodically too: key cooldowns expire without a release
+                        self._cond.wait(min(remaining, 1.0))
+                finally:
+                    self._waiting.remove(waiter)
+                    self._changed()
+                    self._cond.notify_all()
+        except RuntimeError:
+            if status == "ok":
+                status = "no_keys"
+            raise
+        finally:
+            observe("llm_queue", time.perf_counter() - start, priority=priority, status=status)
+
+    def release(self, key, priority, user):
+        with self._cond:
+            self._key_inflight[key] -= 1
+            if self._key_inflight[key] <= 0:
+                del self._key_inflight[key]
+            self._inflight[priority] -= 1
+            # Forget idle users so the tag map stays bounded
+            if self._user_tag.get((user, priority), 0) <= self._virtual_time and not any(
+                    w["user"] == user and w["priority"] == priority for w in self._waiting):
+                self._user_tag.pop((user, priority), None)
+            self._changed()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, user=None):
+        """Hold one key slot for a single Gemini attempt; yields the key."""
+        user = str(user) if user is not None else _request_user()
+        key = self.acquire(priority, user)
+        try:
+            yield key
+        finally:
+            self.release(key, priority, user)
+
+    # ----- Metrics -----
+    def snapshot(self):
+        with self._cond:
+            queued = {p: 0 for p in PRIORITIES}
+            for w in self._waiting:
+                queued[w["priority"]] += 1
+            return {
+                "ts": time.time(),
+                "queued": queued,
+                "inflight": dict(self._inflight),
+                "capacity": self._capacity(),
+            }
+
+    def _changed(self):
+        """Mark the snapshot stale; a per-process thread publishes it (no Redis I/O under the lock)."""
+        self._dirty = True
+        if self._publisher_pid != os.getpid():
+            self._publisher_pid = os.getpid()
+            threading.Thread(target=self._publish_loop, name="llm-scheduler-metrics", daemon=True).start()
+
+    def _publish_loop(self):
+        from utils.cache import r
+        raw = r.raw if hasattr(r, "raw") else r
+        while True:
+            time.sleep(PUBLISH_INTERVAL)
+            if not self._dirty:
+                continue
+            self._dirty = False
+            try:
+                raw.hset(SCHEDULER_METRICS_KEY, str(os.getpid()), json.dumps(self.snapshot()))
+            except Exception as e:
+                print(f"[LLM SCHEDULER] Metrics publish failed: {e}")
+
+
+def _request_user():
+    """The JWT user of the current request, for fairness when the caller didn't pass one."""
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        return str(get_jwt_identity() or "anonymous")
+    except Exception:  # outside a request, or no JWT verified
+        return "anonymous"
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(rotator):
+    """One scheduler per key rotator per process."""
+    scheduler = _schedulers.get(id(rotator))
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.setdefault(id(rotator), LLMScheduler(rotator))
+    return scheduler
+
+
+def read_scheduler_metrics(raw):
+    """Sum the live per-process snapshots: (queued by class, in flight by class, key slots)."""
+    queued = {p: 0 for p in PRIORITIES}
+    inflight = {p: 0 for p in PRIORITIES}
+    capacity = 0
+    now = time.time()
+    for _, value in raw.hgetall(SCHEDULER_METRICS_KEY).items():
+        snap = json.loads(value)
+        if now - snap.get("ts", 0) > SNAPSHOT_MAX_AGE:
+            continue
+        for p in PRIORITIES:
+            queued[p] += snap["queued"].get(p, 0)
+            inflight[p] += snap["inflight"].get(p, 0)
+        capacity += snap.get("capacity", 0)
+    return queued, inflight, capacity
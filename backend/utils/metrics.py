@@ -0,0 +1,221 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+
+# ===== Stage Latency Metrics =====
+# timed("stage", **labels) records a latency histogram per (stage, labels).
+# Observations are buffered in-process and flushed to one Redis hash with a
+# single pipeline at the end of each request, so /metrics sees every worker
+# and nothing is added to the request's own hot path besides a dict update.
+# Within a request the per-stage totals are also returned as Server-Timing.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_KEY = "metrics:latency"
+FLUSH_INTERVAL = 5  # seconds, for observations made outside a request
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_pending = {}  # series -> [bucket counts..., +Inf count, sum]
+_pending_lock = threading.Lock()
+_last_flush = time.time()
+
+
+def _series(stage, labels):
+    parts = [f"stage={stage}"] + [f"{k}={v}" for k, v in sorted(labels.items())]
+    return ",".join(parts)
+
+
+def observe(stage, seconds, **labels):
+    """Record one duration (in seconds) for a stage."""
+    if not METRICS_ENABLED:
+        return
+    series = _series(stage, labels)
+    bucket = bisect.bisect_left(BUCKETS, seconds)
+    with _pending_lock:
+        counts = _pending.get(series)
+        if counts is None:
+            counts = _pending[series] = [0] * (len(BUCKETS) + 1) + [0.0]
+        counts[bucket] += 1
+        counts[-1] += seconds
+
+    if has_request_context():
+        timings = g.setdefault("stage_timings", {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+    elif time.time() - _last_flush > FLUSH_INTERVAL:
+        flush()
+
+
+@contextmanager
+def timed(stage, **labels):
+    """
+    Time the block as `stage`. Yields the label dict so the caller can add
+    labels it only learns inside the block (e.g. labels["status"] = "429").
+    """
+    start = time.perf_counter()
+    try:
+        yield labels
+    except Exception:
+        labels.setdefault("status", "error")
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, **labels)
+
+
+def flush():
+    """Move buffered observations into Redis (one pipeline)."""
+    global _last_flush
+    from utils.cache import r
+
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.time()
+    if not pending:
+        return
+
+    try:
+        pipe = r.raw.pipeline() if hasattr(r, "raw") else r.pipeline()
+        for series, counts in pending.items():
+            for i, count in enumerate(counts[:-1]):
+                if count:
+                    pipe.hincrby(METRICS_KEY, f"{series}|{i}", count)
+            pipe.hincrby(METRICS_KEY, f"{series}|count", sum(counts[:-1]))
+            pipe.hincrbyfloat(METRICS_KEY, f"{series}|sum", counts[-1])
+        pipe.execute()
+    except Exception as e:
+        print(f"[METRICS] Flush failed: {e}")
+
+
+# ===== Redis Round Trips =====
+class _TimedPipeline:
+    def __init__(self, pipe):
+        self._pipe = pipe
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    def execute(self, *args, **kwargs):
+        with timed("redis", cmd="pipeline"):
+            return self._pipe.execute(*args, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._pipe.__exit__(*exc)
+
+
+class TimedRedis:
+    """
+    Proxy around the cache client that times every command as stage "redis"
+    (labelled by command). Pub/sub is passed through untimed; `raw` is the
+    wrapped client.
+    """
+
+    def __init__(self, client):
+        self.raw = client
+
+    def __getattr__(self, name):
+        attr = getattr(self.raw, name)
+        if not callable(attr) or name in ("pubsub", "register_script"):
+            return attr
+        if name == "pipeline":
+            return lambda *args, **kwargs: _TimedPipeline(attr(*args, **kwargs))
+
+        def command(*args, **kwargs):
+            with timed("redis", cmd=name):
+                return attr(*args, **kwargs)
+        return command
+
+
+# ===== Flask Integration =====
+def _server_timing(timings, total):
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in sorted(timings.items())]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def init_metrics(app):
+    """Time every request and attach a Server-Timing header with its stages."""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _finish_timer(response):
+        start = g.get("request_start")
+        if start is not None and request.endpoint != "metrics":
+            total = time.perf_counter() - start
+            observe("request", total, endpoint=request.endpoint or "unknown")
+            timings = dict(g.get("stage_timings", {}))
+            timings.pop("request", None)
+            response.headers["Server-Timing"] = _server_timing(timings, total)
+        flush()
+        return response
+
+
+# ===== Prometheus Exposition =====
+def _labels_text(series, extra=None):
+    pairs = [p.split("=", 1) for p in series.split(",")]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(client):
+    """Render the shared histograms (plus VAD counters and LLM queue gauges) in Prometheus text format."""
+    flush()
+    raw = client.raw if hasattr(client, "raw") else client
+    stored = {k.decode(): v.decode() for k, v in raw.hgetall(METRICS_KEY).items()}
+
+    series_data = {}
+    for field, value in stored.items():
+        series, _, slot = field.rpartition("|")
+        series_data.setdefault(series, {})[slot] = value
+
+    name = "interview_stage_duration_seconds"
+    lines = [
+        f"# HELP {name} Latency of each backend stage (embed, faiss, redis, gemini, whisper, tts, request).",
+        f"# TYPE {name} histogram",
+    ]
+    bounds = [str(b) for b in BUCKETS] + ["+Inf"]
+    for series in sorted(series_data):
+        data = series_data[series]
+        cumulative = 0
+        for i, bound in enumerate(bounds):
+            cumulative += int(data.get(str(i), 0))
+            lines.append(f"{name}_bucket{_labels_text(series, ('le', bound))} {cumulative}")
+        lines.append(f"{name}_sum{_labels_text(series)} {float(data.get('sum', 0))}")
+        lines.append(f"{name}_count{_labels_text(series)} {int(data.get('count', 0))}")
+
+    from utils.stt import VAD_METRICS_KEY
+    vad = {k.decode(): v.decode() for k, v in raw.hgetall(VAD_METRICS_KEY).items()}
+    for field, help_text in (
+        ("clips", "Audio clips passed through VAD"),
+        ("original_seconds", "Seconds of audio received"),
+        ("seconds_saved", "Seconds of audio VAD kept away from Whisper"),
+    ):
+        lines.append(f"# HELP interview_vad_{field}_total {help_text}.")
+        lines.append(f"# TYPE interview_vad_{field}_total counter")
+        lines.append(f"interview_vad_{field}_total {float(vad.get(field, 0))}")
+
+    from utils.llm_scheduler import read_scheduler_metrics
+    queued, inflight, capacity = read_scheduler_metrics(raw)
+    for metric, help_text, values in (
+        ("interview_llm_queue_depth", "Gemini calls waiting for a key slot", queued),
+        ("interview_llm_inflight", "Gemini calls holding a key slot", inflight),
+    ):
+        lines.append(f"# HELP {metric} {help_text}, by priority class.")
+        lines.append(f"# TYPE {metric} gauge")
+        for priority, value in sorted(values.items()):
+            lines.append(f'{metric}{{priority="{priority}"}} {value}')
+    lines.append("# HELP interview_llm_key_slots Gemini key slots available (keys not in cooldown x per-key cap).")
+    lines.append("# TYPE interview_llm_key_slots gauge")
+    lines.append(f"interview_llm_key_slots {capacity}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,126 @@
+from models import db, UserPerformance
+
+SCORE_DIMENSIONS = (
+    "technical_score",
+    "completeness_score",
+    "communication_score",
+    "depth_of_knowledge",
+    "problem_solving_score",
+)
+RECENT_SESSIONS = 10
+
+
+def _numeric(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _add(totals, key, value):
+    entry = totals.setdefault(key, {"sum": 0, "count": 0})
+    entry["sum"] += value
+    entry["count"] += 1
+
+
+def _averages(totals):
+    return {
+        key: round(entry["sum"] / entry["count"], 2) if entry["count"] else None
+        for key, entry in totals.items()
+    }
+
+
+def _ensure_rollup_row(user_id):
+    """
+    Create the user's empty rollup row if missing (INSERT ... ON CONFLICT DO
+    NOTHING), so two first sessions finishing together don't collide on the
+    primary key and roll back the caller's transaction.
+    """
+    values = {"user_id": user_id, "session_count": 0, "question_count": 0}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        # No portable upsert: try the insert in a savepoint instead
+        from sqlalchemy.exc import IntegrityError
+        try:
+            with db.session.begin_nested():
+                db.session.add(UserPerformance(**values))
+        except IntegrityError:
+            pass
+        return
+    db.session.execute(insert(UserPerformance).values(**values).on_conflict_do_nothing(index_elements=["user_id"]))
+
+
+def update_user_rollup(user_id, session, evaluations, stages):
+    """
+    Fold one finished session into the user's rollup row. Runs inside the
+    caller's transaction; the row is locked (FOR UPDATE) so two sessions
+    ending together can't lose each other's counts.
+    """
+    _ensure_rollup_row(user_id)
+    row = (
+        UserPerformance.query
+        .filter_by(user_id=user_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+
+    # JSON columns are only persisted on reassignment, so work on copies
+    dimension_totals = dict((k, dict(v)) for k, v in (row.dimension_totals or {}).items())
+    stage_totals = dict((k, dict(v)) for k, v in (row.stage_totals or {}).items())
+    verdict_counts = dict(row.verdict_counts or {})
+
+    session_scores = []
+    for evaluation, stage in zip(evaluations, stages):
+        scores = [_numeric(evaluation.get(dim)) for dim in SCORE_DIMENSIONS]
+        for dim, score in zip(SCORE_DIMENSIONS, scores):
+            if score is not None:
+                _add(dimension_totals, dim, score)
+
+        present = [score for score in scores if score is not None]
+        if present:
+            question_avg = sum(present) / len(present)
+            _add(stage_totals, stage, question_avg)
+            session_scores.append(question_avg)
+
+        verdict = evaluation.get("verdict")
+        if verdict:
+            verdict_counts[verdict] = verdict_counts.get(verdict, 0) + 1
+
+    recent = list(row.recent_sessions or [])
+    recent.append({
+        "session_id": session.id,
+        "ended_at": session.ended_at.isoformat() if session.ended_at else None,
+        "average": round(sum(session_scores) / len(session_scores), 2) if session_scores else None
+    })
+
+    row.session_count = (row.session_count or 0) + 1
+    row.question_count = (row.question_count or 0) + len(evaluations)
+    row.dimension_totals = dimension_totals
+    row.stage_totals = stage_totals
+    row.verdict_counts = verdict_counts
+    row.recent_sessions = recent[-RECENT_SESSIONS:]
+    return row
+
+
+def serialize_rollup(row):
+    if row is None:
+        return {
+            "session_count": 0,
+            "question_count": 0,
+            "dimension_averages": {},
+            "stage_averages": {},
+            "verdict_counts": {},
+            "recent_sessions": [],
+            "updated_at": None
+        }
+    return {
+        "session_count": row.session_count,
+        "question_count": row.question_count,
+        "dimension_averages": _averages(row.dimension_totals or {}),
+        "stage_averages": _averages(row.stage_totals or {}),
+        "verdict_counts": row.verdict_counts or {},
+        "recent_sessions": row.recent_sessions or [],
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
+    }
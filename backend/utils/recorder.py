@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import hmac
+import hashlib
+import threading
+from flask import g, request
+
+# ===== Session Record / Replay =====
+# Recording (RECORD_SESSIONS=true): every interview request that belongs to a
+# session is appended to RECORDINGS_DIR/session_<hash>.jsonl with its timing,
+# a sanitized body and the external calls it made (Gemini outputs, transcripts,
+# TTS audio sizes). Free text typed or spoken by the candidate, and every
+# Gemini output (questions and evaluations quote the resume and answers), is
+# replaced by pseudo-words of the same length, so size and repetition survive
+# but content doesn't; JSON outputs keep their keys, numbers and verdicts so
+# they still parse on replay. Prompts are never stored.
+#
+# Replay (REPLAY_ENABLED=true, never in production): requests carrying
+# X-Replay-Recording / X-Replay-Event get their external calls answered from
+# that recorded event instead of Gemini/Whisper/TTS, after the recorded
+# latency divided by X-Replay-Speed. benchmarks/replay.py drives this.
+RECORD_SESSIONS = os.getenv("RECORD_SESSIONS", "false").lower() == "true"
+REPLAY_ENABLED = os.getenv("REPLAY_ENABLED", "false").lower() == "true"
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+
+RECORDED_ENDPOINTS = {
+    "interview.start_interview": "start",
+    "interview.ask_question": "ask",
+    "interview.submit_answer": "answer",
+    "interview.submit_answer_chunk": "answer_chunk",
+    "interview.finish_answer_stream": "answer_finish",
+    "interview.get_summary": "summary",
+}
+# Request fields kept verbatim; every other string is sanitized
+SAFE_FIELDS = {"session_id", "question_id", "topic"}
+
+_SALT = os.urandom(16)
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_write_lock = threading.Lock()
+
+
+# ===== Sanitizing =====
+def _pseudo_word(match):
+    word = match.group(0)
+    digest = hmac.new(_SALT, word.lower().encode(), hashlib.md5).hexdigest()
+    letters = "".join(chr(ord("a") + int(c, 16) % 26) for c in digest * (len(word) // 32 + 1))
+    return letters[:len(word)]
+
+
+def sanitize_text(text):
+    """Replace every word with a salted pseudo-word of the same length."""
+    return _WORD_RE.sub(_pseudo_word, text or "")
+
+
+def _sanitize_fields(fields):
+    clean = {}
+    for key, value in (fields or {}).items():
+        if key in SAFE_FIELDS or not isinstance(value, str):
+            clean[key] = value
+        else:
+            clean[key] = sanitize_text(value)
+    return clean
+
+
+# Enumerated values in Gemini's JSON that say nothing about the candidate
+SAFE_OUTPUT_FIELDS = {"verdict", "technical_level"}
+
+
+def _sanitize_json(value, key=None):
+    if isinstance(value, dict):
+        return {k: _sanitize_json(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_sanitize_json(v, key) for v in value]
+    if isinstance(value, str) and key not in SAFE_OUTPUT_FIELDS:
+        return sanitize_text(value)
+    return value
+
+
+def sanitize_llm_output(text):
+    """sanitize_text for model output; JSON replies keep their structure."""
+    from utils.llm import parse_llm_json
+    try:
+        parsed = parse_llm_json(text)
+    except (ValueError, TypeError):
+        return sanitize_text(text)
+    if not isinstance(parsed, (dict, list)):
+        return sanitize_text(text)
+    return json.dumps(_sanitize_json(parsed), ensure_ascii=False)
+
+
+# ===== External Calls =====
+# kind -> (what to record from a result, how to rebuild the result on replay)
+EXTERNAL_KINDS = {
+    "gemini": (lambda out: {"output": sanitize_llm_output(out)}, lambda rec: rec["output"]),
+    "stt": (lambda text: {"transcript": sanitize_text(text)}, lambda rec: rec["transcript"]),
+    "tts": (lambda audio: {"bytes": len(audio or b"")}, lambda rec: bytes(rec["bytes"])),
+}
+
+
+def external_call(kind, fn):
+    """
+    Run a call to an external service through the recorder.
+    Outside a request, or with recording and replay both off, this is fn().
+    """
+    if not (RECORD_SESSIONS or REPLAY_ENABLED):
+        return fn()
+    try:
+        replay = g.get("replay")
+    except RuntimeError:  # no app/request context (worker threads, scripts)
+        return fn()
+
+    save, load = EXTERNAL_KINDS[kind]
+    if replay is not None:
+        recorded = _next_replayed(replay, kind)
+        delay = recorded.get("latency_ms", 0) / 1000 / replay["speed"]
+        if delay > 0:
+            time.sleep(delay)
+        if "error" in recorded:
+            raise RuntimeError(f"[replayed] {recorded['error']}")
+        return load(recorded)
+
+    start = time.perf_counter()
+    entry = {"kind": kind}
+    try:
+        result = fn()
+        entry.update(save(result))
+        return result
+    except Exception as e:
+        entry["error"] = str(e)
+        raise
+    finally:
+        entry["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if RECORD_SESSIONS:
+            g.setdefault("external_calls", []).append(entry)
+
+
+def _next_replayed(replay, kind):
+    """Next unused recorded call of this kind for the event, else the last one of its kind anywhere."""
+    for i, entry in enumerate(replay["calls"]):
+        if entry["kind"] == kind:
+            return replay["calls"].pop(i)
+    fallback = replay["fallback"].get(kind)
+    if fallback is None:
+        raise RuntimeError(f"Recording has no '{kind}' response to replay")
+    return fallback
+
+
+# ===== Recording Files =====
+def recording_name(user_id, session_id):
+    digest = hashlib.sha1(f"{user_id}:{session_id}".encode()).hexdigest()[:16]
+    return f"session_{digest}.jsonl"
+
+
+def _append(name, record):
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _write_lock:
+        with open(os.path.join(RECORDINGS_DIR, name), "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def load_recording(path):
+    """Return (header, request events) from a recording file."""
+    header, events = {}, []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") == "session":
+                header = record
+            else:
+                events.append(record)
+    return header, events
+
+
+_replay_cache = {}
+
+
+def _replay_events(name):
+    name = os.path.basename(name)
+    if name not in _replay_cache:
+        _replay_cache[name] = load_recording(os.path.join(RECORDINGS_DIR, name))[1]
+    return _replay_cache[name]
+
+
+# ===== Flask Integration =====
+def _request_fields():
+    body = request.get_json(silent=True) if request.is_json else None
+    files = {
+        field: {"bytes": len(f.read()), "content_type": f.mimetype, "ext": os.path.splitext(f.filename or "")[1]}
+        for field, f in request.files.items()
+    }
+    for f in request.files.values():
+        f.seek(0)
+    return {
+        "json": _sanitize_fields(body) if isinstance(body, dict) else None,
+        "form": _sanitize_fields(request.form.to_dict()) or None,
+        "files": files or None,
+    }
+
+
+def init_recorder(app):
+    if not (RECORD_SESSIONS or REPLAY_ENABLED):
+        return
+
+    @app.before_request
+    def _start_recording():
+        if REPLAY_ENABLED and "X-Replay-Recording" in request.headers:
+            events = _replay_events(request.headers["X-Replay-Recording"])
+            index = int(request.headers.get("X-Replay-Event", 0))
+            fallback = {}
+            for event in events:
+                for call in event.get("external", []):
+                    if "error" not in call:
+                        fallback[call["kind"]] = call
+            g.replay = {
+                "calls": list(events[index].get("external", [])) if index < len(events) else [],
+                "fallback": fallback,
+                "speed": max(0.01, float(request.headers.get("X-Replay-Speed", 1))),
+            }
+        elif RECORD_SESSIONS and request.endpoint in RECORDED_ENDPOINTS:
+            g.record_start = time.time()
+            g.record_request = _request_fields()
+
+    @app.after_request
+    def _finish_recording(response):
+        if g.get("record_start") is None:
+            return response
+        try:
+            _record_event(response)
+        except Exception as e:
+            print(f"[RECORDER] Failed to record {request.endpoint}: {e}")
+        return response
+
+
+def _record_event(response):
+    from flask_jwt_extended import get_jwt_identity
+    from models import User
+
+    try:
+        user_id = get_jwt_identity()
+    except RuntimeError:  # request was rejected before the JWT was verified
+        return
+    fields = g.record_request
+    session_id = (fields["json"] or fields["form"] or {}).get("session_id")
+    if request.endpoint == "interview.start_interview":
+        session_id = (response.get_json(silent=True) or {}).get("session_id")
+    if user_id is None or session_id is None:
+        return
+
+    name = recording_name(user_id, session_id)
+    if request.endpoint == "interview.start_interview":
+        user = User.query.get(int(user_id))
+        resume = (user.resume_text or "") if user else ""
+        _append(name, {
+            "type": "session",
+            "recorded_at": g.record_start,
+            "resume_chars": len(resume),
+            "resume_lines": len([line for line in resume.splitlines() if line.strip()]),
+        })
+
+    _append(name, {
+        "type": "request",
+        "endpoint": RECORDED_ENDPOINTS[request.endpoint],
+        "method": request.method,
+        "ts": g.record_start,
+        "duration_ms": round((time.time() - g.record_start) * 1000, 1),
+        "status": response.status_code,
+        **fields,
+        "external": g.get("external_calls", []),
+    })
@@ -0,0 +1,298 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import time
+import numpy as np
+from contextlib import nullcontext
+from utils.concurrency import run_cpu_bound
+from utils.embeddings import encode, EMBEDDING_MODEL_NAME
+from utils.metrics import timed
+
+# ===== Resume Chunking + Index =====
+# The only writer of per-user resume indexes (called by the /upload_resume
+# ingestion job). A resume is split into section-aware chunks: a heading
+# (EXPERIENCE, Skills:, ...) always starts a new chunk, and inside a section
+# whole sentences/bullets are packed into a window of RESUME_CHUNK_TOKENS
+# words with RESUME_CHUNK_OVERLAP words carried over, so no chunk cuts a word
+# or a sentence (unless one sentence alone exceeds the window). Words stand in
+# for model tokens so chunking never loads the tokenizer.
+#
+# Per user, RESUME_INDEX_DIR/<user>/ (default embeddings/resumes) holds
+# versions of the index, each a directory with:
+#   vectors.npy   float16 matrix, one row per chunk
+#   chunks.json   compact metadata: model, window and [{text, section, hash}]
+# and a CURRENT file naming the live version. A rebuild writes a new version
+# directory, then replaces CURRENT in one rename, so readers always get a
+# matching pair. The previous version is kept for RESUME_INDEX_GRACE seconds
+# for readers that already resolved it.
+# Re-uploads reuse the stored vector of every chunk whose hash is unchanged.
+# Users indexed by the old FAISS layout are read from it until they upload
+# again; those files are never modified.
+RESUME_INDEX_DIR = os.path.abspath(os.getenv(
+    "RESUME_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embeddings", "resumes"),
+))
+RESUME_CHUNK_TOKENS = int(os.getenv("RESUME_CHUNK_TOKENS", 80))
+RESUME_CHUNK_OVERLAP = int(os.getenv("RESUME_CHUNK_OVERLAP", 16))
+RESUME_INDEX_GRACE = int(os.getenv("RESUME_INDEX_GRACE", 60))
+os.makedirs(RESUME_INDEX_DIR, exist_ok=True)
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+
+SECTION_NAMES = {
+    "summary", "profile", "objective", "about", "about me", "experience", "work experience",
+    "professional experience", "employment", "education", "skills", "technical skills",
+    "projects", "certifications", "achievements", "awards", "publications", "languages",
+    "interests", "activities", "volunteering", "leadership", "courses", "training",
+}
+_BULLET_RE = re.compile(r"^[\s•●▪◦‣∙·*\-–—]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(])")
+
+
+# ===== Chunking =====
+def _section_heading(line):
+    """Heading text if the line looks like a section title, else None."""
+    name = line.strip().rstrip(":").strip()
+    if not name or len(name.split()) > 4:
+        return None
+    if name.lower() in SECTION_NAMES:
+        return name
+    letters = [c for c in name if c.isalpha()]
+    if len(letters) >= 4 and all(c.isupper() for c in letters) and line.strip().endswith(":"):
+        return name
+    return None
+
+
+def _sections(text):
+    """[(section name or None, [sentences...])] in document order."""
+    sections = [(None, [])]
+    for raw in text.split("\n"):
+        line = raw.strip()
+        if not line:
+            continue
+        heading = _section_heading(line)
+        if heading:
+            sections.append((heading.title() if heading.isupper() else heading, []))
+            continue
+
+        bullet = bool(_BULLET_RE.match(line))
+        line = _BULLET_RE.sub("", line).strip()
+        if not line:
+            continue
+        sentences = sections[-1][1]
+        # PDF extraction wraps long bullets; a lowercase start continues the previous sentence
+        if sentences and not bullet and line[0].islower() and not sentences[-1].endswith((".", "!", "?")):
+            sentences[-1] += " " + line
+            line = ""
+        if line:
+            sentences.extend(s for s in _SENTENCE_RE.split(line) if s)
+    return [(name, sentences) for name, sentences in sections if sentences]
+
+
+def _split_long(words, max_tokens, overlap):
+    step = max(1, max_tokens - overlap)
+    return [words[i:i + max_tokens] for i in range(0, max(1, len(words) - overlap), step)]
+
+
+def chunk_resume(text, max_tokens=None, overlap=None):
+    """
+    Split resume text into retrieval chunks.
+    Returns [{"text", "section"}] with at most max_tokens words per chunk.
+    """
+    max_tokens = max_tokens or RESUME_CHUNK_TOKENS
+    overlap = min(RESUME_CHUNK_OVERLAP if overlap is None else overlap, max_tokens // 2)
+    chunks = []
+    for section, sentences in _sections(text or ""):
+        window = []  # list of word lists, one per sentence
+        size = 0
+
+        def emit():
+            chunks.append({"text": " ".join(w for s in window for w in s), "section": section})
+
+        for sentence in sentences:
+            words = sentence.split()
+            pieces = _split_long(words, max_tokens, overlap) if len(words) > max_tokens else [words]
+            for piece in pieces:
+                if window and size + len(piece) > max_tokens:
+                    emit()
+                    # Carry whole trailing sentences, up to `overlap` words, into the next window
+                    carried, carried_size = [], 0
+                    for s in reversed(window):
+                        if carried_size + len(s) > overlap:
+                            break
+                        carried.insert(0, s)
+                        carried_size += len(s)
+                    # Overlap never pushes a chunk past the window
+                    if carried_size + len(piece) > max_tokens:
+                        carried, carried_size = [], 0
+                    window, size = carried, carried_size
+                window.append(piece)
+                size += len(piece)
+        if window:
+            emit()
+    return chunks
+
+
+def _embedding_text(chunk):
+    return f"{chunk['section']}: {chunk['text']}" if chunk["section"] else chunk["text"]
+
+
+def chunk_hash(chunk):
+    return hashlib.sha1(_embedding_text(chunk).encode("utf-8")).hexdigest()[:16]
+
+
+# ===== Storage =====
+def _user_dir(user_id):
+    return os.path.join(RESUME_INDEX_DIR, str(user_id))
+
+
+def _legacy_paths(user_id):
+    """(faiss, json) pairs written by earlier indexers, newest layout first."""
+    user_dir = _user_dir(user_id)
+    return [
+        (os.path.join(user_dir, "resume_index.faiss"), os.path.join(user_dir, "resume_data.json")),
+        (os.path.join(RESUME_INDEX_DIR, f"resume_{user_id}.faiss"), os.path.join(RESUME_INDEX_DIR, f"resume_{user_id}.json")),
+    ]
+
+
+def _load_legacy_index(user_id):
+    """Convert an old-layout FAISS index in memory; the files are left as they are."""
+    for index_path, data_path in _legacy_paths(user_id):
+        if not os.path.exists(index_path) or not os.path.exists(data_path):
+            continue
+        import faiss
+        index = faiss.read_index(index_path)
+        with open(data_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        chunks = []
+        for entry in entries:
+            text = entry["question"] if isinstance(entry, dict) else entry
+            chunk = {"text": text, "section": None}
+            chunks.append(dict(chunk, hash=chunk_hash(chunk)))
+        vectors = index.reconstruct_n(0, index.ntotal).astype(np.float16)
+        meta = {"model": EMBEDDING_MODEL_NAME, "dim": int(index.d), "legacy": True, "chunks": chunks}
+        return vectors, meta
+    return None, None
+
+
+def _current_version(user_id):
+    try:
+        with open(os.path.join(_user_dir(user_id), CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_resume_index(user_id):
+    """(float16 vectors, metadata dict) for the user, or (None, None) if not indexed."""
+    try:
+        version = _current_version(user_id)
+        if version is None:
+            return _load_legacy_index(user_id)
+        version_dir = os.path.join(_user_dir(user_id), version)
+        vectors = np.load(os.path.join(version_dir, VECTORS_FILE))
+        with open(os.path.join(version_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except Exception as e:
+        print(f"[RESUME INDEX] Ignoring unreadable index for user {user_id}: {e}")
+        return None, None
+    return vectors, meta
+
+
+def _remove_old_versions(user_dir, keep):
+    """Delete versions other than `keep` once they are past the grace period."""
+    cutoff = time.time() - RESUME_INDEX_GRACE
+    for name in os.listdir(user_dir):
+        path = os.path.join(user_dir, name)
+        if not name.startswith(VERSION_PREFIX) or name in keep or not os.path.isdir(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+        except OSError:
+            pass  # already removed by a concurrent rebuild
+
+
+def _commit_version(user_id, matrix, meta):
+    """Write a new version directory and make it current with one rename."""
+    user_dir = _user_dir(user_id)
+    os.makedirs(user_dir, exist_ok=True)
+    version_dir = tempfile.mkdtemp(prefix=VERSION_PREFIX, dir=user_dir)
+    with open(os.path.join(version_dir, VECTORS_FILE), "wb") as f:
+        np.save(f, matrix)
+    with open(os.path.join(version_dir, CHUNKS_FILE), "wb") as f:
+        f.write(json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    previous = _current_version(user_id)
+    fd, pointer_tmp = tempfile.mkstemp(prefix=CURRENT_FILE + ".", suffix=".tmp", dir=user_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version_dir))
+    os.replace(pointer_tmp, os.path.join(user_dir, CURRENT_FILE))
+    _remove_old_versions(user_dir, keep={os.path.basename(version_dir), previous})
+
+
+def build_resume_index(user_id, resume_text, guard=None):
+    """
+    Chunk, embed and store this user's resume, replacing any previous index
+    (an empty resume leaves an empty index). Chunks already embedded by a
+    previous upload (same text, same model) are reused by hash; only new ones
+    are encoded. Returns (reused, encoded).
+    `guard` is an optional context manager factory held around the swap; if
+    it yields False the new index is discarded and None is returned.
+    """
+    chunks = chunk_resume(resume_text)
+    hashes = [chunk_hash(c) for c in chunks]
+
+    vectors = {}
+    old_vectors, old_meta = load_resume_index(user_id)
+    if old_meta and old_meta.get("model") == EMBEDDING_MODEL_NAME:
+        vectors = {c["hash"]: old_vectors[i] for i, c in enumerate(old_meta["chunks"])}
+
+    missing = {h: _embedding_text(c) for h, c in zip(hashes, chunks) if h not in vectors}
+    if missing:
+        with timed("embed"):
+            encoded = run_cpu_bound(encode, list(missing.values()))
+        vectors.update(zip(missing, np.asarray(encoded, dtype=np.float16)))
+
+    if chunks:
+        matrix = np.vstack([vectors[h] for h in hashes]).astype(np.float16)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float16)
+    meta = {
+        "model": EMBEDDING_MODEL_NAME,
+        "dim": int(matrix.shape[1]),
+        "tokens": RESUME_CHUNK_TOKENS,
+        "overlap": RESUME_CHUNK_OVERLAP,
+        "chunks": [dict(c, hash=h) for c, h in zip(chunks, hashes)],
+    }
+    with guard() if guard else nullcontext(True) as ok:
+        if not ok:
+            return None
+        _commit_version(user_id, matrix, meta)
+    return sum(h not in missing for h in hashes), len(missing)
+
+
+# ===== Search =====
+def search_resume(user_id, query, k=3):
+    """Top-k resume chunks for the query as [{"text", "section"}]."""
+    vectors, meta = load_resume_index(user_id)
+    if vectors is None or not len(vectors):
+        return []
+
+    import faiss
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors.astype(np.float32))
+    with timed("embed"):
+        vec = run_cpu_bound(encode, [query])
+    with timed("faiss", index="resume"):
+        D, I = index.search(np.asarray(vec, dtype=np.float32), min(k, len(vectors)))
+    return [
+        {"text": meta["chunks"][i]["text"], "section": meta["chunks"][i]["section"]}
+        for i in I[0] if 0 <= i < len(meta["chunks"])
+    ]
@@ -0,0 +1,138 @@
+import io
+import os
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from models import db, User
+from contextlib import contextmanager
+from utils.cache import r, invalidate_resume_text, redis_lock
+from utils.concurrency import run_cpu_bound
+from utils.resume_index import build_resume_index
+from utils.metrics import timed
+
+# ===== Background Resume Ingestion =====
+# /upload_resume only validates the file and queues a job; parsing the PDF,
+# saving the text and updating the resume index (utils/resume_index.py)
+# happen here, off the request. Job state lives in Redis so any worker can
+# answer the status endpoint.
+# If a user uploads again before a job finishes, the older job stops at its
+# next step ("superseded") so the newest resume always wins. The checks
+# before the DB write and the index swap run under a per-user lock, so a
+# superseded job can't commit between the check and the write.
+# Jobs run in this process only: if the worker dies mid-job nothing resumes
+# it, so a job whose state hasn't moved for RESUME_JOB_MAX_AGE seconds is
+# reported as failed.
+INGEST_WORKERS = int(os.getenv("RESUME_INGEST_WORKERS", 2))
+JOB_TTL = 86400
+JOB_MAX_AGE = int(os.getenv("RESUME_JOB_MAX_AGE", 300))
+ACTIVE_STATUSES = ("queued", "parsing", "indexing")
+COMMIT_LOCK_TIMEOUT = 30  # seconds; the guarded writes take milliseconds
+
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="resume-ingest")
+
+
+def job_key(job_id):
+    return f"resume_job:{job_id}"
+
+
+def latest_job_key(user_id):
+    return f"resume_job:latest:{user_id}"
+
+
+def _save_job(job, **fields):
+    job.update(fields, updated_at=time.time())
+    r.set(job_key(job["job_id"]), json.dumps(job), ex=JOB_TTL)
+
+
+def get_job(job_id, user_id):
+    """Job status dict, or None if it doesn't exist or belongs to someone else."""
+    raw = r.get(job_key(job_id))
+    if not raw:
+        return None
+    job = json.loads(raw)
+    if job.get("user_id") != user_id:
+        return None
+    if job.get("status") in ACTIVE_STATUSES and time.time() - job.get("updated_at", 0) > JOB_MAX_AGE:
+        job.update(status="failed", error="Resume processing stopped; please upload it again")
+    return job
+
+
+def _superseded(job):
+    latest = r.get(latest_job_key(job["user_id"]))
+    latest = latest.decode() if isinstance(latest, bytes) else latest
+    return latest is not None and latest != job["job_id"]
+
+
+@contextmanager
+def _commit_guard(job):
+    """Per-user lock around a write; yields False if the job is superseded or the lock times out."""
+    with redis_lock(f"resume_commit:{job['user_id']}", lock_timeout=COMMIT_LOCK_TIMEOUT,
+                    wait_timeout=COMMIT_LOCK_TIMEOUT) as acquired:
+        yield acquired and not _superseded(job)
+
+
+def _stopped(job):
+    if _superseded(job):
+        return _save_job(job, status="superseded")
+    return _save_job(job, status="failed", error="Timed out waiting for another upload to finish")
+
+
+def extract_resume_text(pdf_bytes):
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return "\n".join([page.extract_text() or "" for page in pdf.pages])
+
+
+def submit_resume(app, user_id, pdf_bytes):
+    """Queue a resume for parsing and indexing; returns the new job."""
+    job = {"job_id": uuid.uuid4().hex, "user_id": user_id, "status": "queued", "created_at": time.time()}
+    _save_job(job)
+    r.set(latest_job_key(user_id), job["job_id"], ex=JOB_TTL)
+    _executor.submit(_run_job, app, dict(job), pdf_bytes)
+    return job
+
+
+def _run_job(app, job, pdf_bytes):
+    user_id = job["user_id"]
+    with app.app_context():
+        try:
+            _save_job(job, status="parsing")
+            try:
+                with timed("resume_ingest", step="parse"):
+                    text = run_cpu_bound(extract_resume_text, pdf_bytes)
+            except Exception as e:
+                print(f"Error in resume parsing: {str(e)}")
+                return _save_job(job, status="failed", error="Failed to parse PDF resume")
+
+            user = User.query.get(user_id)
+            if not user:
+                return _save_job(job, status="failed", error="User not found")
+            with _commit_guard(job) as ok:
+                if not ok:
+                    return _stopped(job)
+                user.resume_text = text
+                db.session.commit()
+            invalidate_resume_text(user_id)
+
+            _save_job(job, status="indexing")
+            if _superseded(job):
+                return _save_job(job, status="superseded")
+            try:
+                with timed("resume_ingest", step="index"):
+                    result = build_resume_index(user_id, text, guard=lambda: _commit_guard(job))
+            except Exception as e:
+                print(f"Error in build_resume_index: {str(e)}")
+                return _save_job(job, status="failed", error="Failed to index resume")
+            if result is None:
+                return _stopped(job)
+            reused, encoded = result
+
+            _save_job(job, status="done", chunks_reused=reused, chunks_encoded=encoded,
+                      duration_ms=round((time.time() - job["created_at"]) * 1000, 1))
+            print(f"[RESUME] User {user_id} indexed: {encoded} new, {reused} reused")
+        except Exception as e:
+            print(f"[RESUME] Ingestion job {job['job_id']} failed: {e}")
+            _save_job(job, status="failed", error="Resume processing failed")
+        finally:
+            db.session.remove()
@@ -0,0 +1,136 @@
+import os
+import re
+import json
+import zlib
+import threading
+import numpy as np
+
+# ===== Anti-Script Detection =====
+# Word-shingle MinHash signatures with an LSH band index over every answer in
+# the question bank. Cost is linear in transcript length (one vectorised pass
+# over its shingles) plus a handful of candidate comparisons: ~0.1 ms for a
+# typical answer and ~2 ms for a 15-minute one, vs difflib's quadratic ratio.
+QUESTION_DATA_PATH = "embeddings/question_data.json"
+
+SHINGLE_WORDS = 2
+NUM_PERM = 64
+BANDS = 32                       # 32 bands x 2 rows: ~30% Jaccard reaches candidates ~95% of the time
+ROWS = NUM_PERM // BANDS
+SCRIPT_THRESHOLD = float(os.getenv("SCRIPT_THRESHOLD", 0.5))
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(42)  # fixed so signatures are stable across processes
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _shingles(text):
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)]
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64)
+
+
+def minhash(text):
+    """NUM_PERM-long MinHash signature of the text's word shingles (None if empty)."""
+    shingles = _shingles(text)
+    if shingles.size == 0:
+        return None
+    return ((_A[:, None] * shingles[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    if sig_a is None or sig_b is None:
+        return 0.0
+    return float(np.mean(sig_a == sig_b))
+
+
+class ScriptIndex:
+    """LSH index of bank answers: band hash -> answer ids."""
+
+    def __init__(self, entries):
+        self.entries = []
+        self.signatures = []
+        self.buckets = [{} for _ in range(BANDS)]
+        for entry in entries:
+            sig = minhash(entry.get("answer", ""))
+            if sig is None:
+                continue
+            doc_id = len(self.entries)
+            self.entries.append(entry)
+            self.signatures.append(sig)
+            for band, key in enumerate(self._band_keys(sig)):
+                self.buckets[band].setdefault(key, []).append(doc_id)
+
+    @staticmethod
+    def _band_keys(sig):
+        return [sig[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+    def query(self, sig):
+        """Return (entry, score) of the best bank answer sharing a band, or (None, 0.0)."""
+        if sig is None:
+            return None, 0.0
+        candidates = set()
+        for band, key in enumerate(self._band_keys(sig)):
+            candidates.update(self.buckets[band].get(key, ()))
+
+        best, best_score = None, 0.0
+        for doc_id in candidates:
+            score = similarity(sig, self.signatures[doc_id])
+            if score > best_score:
+                best, best_score = self.entries[doc_id], score
+        return best, best_score
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_script_index():
+    """Build the bank answer index once per process."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                entries = []
+                if os.path.exists(QUESTION_DATA_PATH):
+                    with open(QUESTION_DATA_PATH, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                _index = ScriptIndex(entries)
+    return _index
+
+
+def detect_scripted_answer(candidate_answer, sample_answer="", threshold=SCRIPT_THRESHOLD):
+    """
+    Compare a transcript against the supplied sample answer and every bank
+    answer. Returns {"scripted", "score", "source", "question"} for the best match.
+    """
+    sig = minhash(candidate_answer)
+    match, score = get_script_index().query(sig)
+    result = {
+        "score": score,
+        "source": match.get("source") if match else None,
+        "question": match.get("question") if match else None,
+    }
+
+    sample_score = similarity(sig, minhash(sample_answer)) if sample_answer else 0.0
+    if sample_score > score:
+        result.update(score=sample_score, source="sample_answer", question=None)
+
+    result["scripted"] = result["score"] >= threshold
+    return result
+
+
+def is_scripted_answer(candidate_answer, sample_answer, threshold=SCRIPT_THRESHOLD):
+    """
+    Checks if candidate answer is too similar to the sample answer or any
+    answer in the question bank.
+    """
+    return detect_scripted_answer(candidate_answer, sample_answer, threshold)["scripted"]
@@ -1,15 +1,103 @@
-import whisper
+import time
+import wave
 import tempfile
 import hashlib
-from utils.cache import r
+import numpy as np
+from config import Config
+from utils.cache import r, single_flight
+from utils.vad import split_speech, SAMPLE_RATE
+from utils.concurrency import run_cpu_bound
+from utils.metrics import timed
+from utils.recorder import external_call
 import os
 import json
+import threading
 
 # Load Whisper model only in worker process
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "base")
 
+# Voice-activity trimming before Whisper (cost scales with audio duration)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_SPLIT = os.getenv("VAD_SPLIT", "true").lower() == "true"
+VAD_METRICS_KEY = "metrics:vad"
+
+# Seconds of simulated compute per second of audio for the stub backend
+STT_STUB_RTF = float(os.getenv("STT_STUB_RTF", 0))
+
+_STUB_WORDS = ("i", "worked", "on", "python", "services", "with", "flask", "and", "redis",
+               "we", "designed", "the", "api", "tested", "deployed", "team", "client", "deadline")
+
+
+class StubWhisperModel:
+    """
+    Whisper stand-in for load tests (STT_BACKEND=stub): no weights, no ffmpeg.
+    Returns a transcript derived from the audio bytes, ~2.5 words per second.
+    """
+
+    def transcribe(self, audio):
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        seconds = len(audio) / SAMPLE_RATE
+        if STT_STUB_RTF:
+            time.sleep(seconds * STT_STUB_RTF)
+        digest = hashlib.md5(np.ascontiguousarray(audio).tobytes()).digest()
+        words = [_STUB_WORDS[digest[i % len(digest)] % len(_STUB_WORDS)] for i in range(max(1, int(seconds * 2.5)))]
+        return {"text": " ".join(words)}
+
+
+def load_audio(path, start=0.0):
+    """
+    Decode an audio file to 16 kHz mono float32, Whisper's input format.
+    With `start` (seconds), decoding begins there instead of at the top.
+    """
+    if Config.STT_BACKEND == "stub":
+        # 16 kHz PCM WAV only; good enough for generated load-test audio
+        with wave.open(path, "rb") as w:
+            channels = w.getnchannels()
+            w.setpos(min(w.getnframes(), int(start * w.getframerate())))
+            raw = w.readframes(w.getnframes() - w.tell())
+        # A partial upload can end mid-frame
+        raw = raw[:len(raw) - len(raw) % (2 * channels)]
+        frames = np.frombuffer(raw, dtype=np.int16)
+        audio = frames.astype(np.float32) / 32768
+        return audio.reshape(-1, channels).mean(axis=1) if channels > 1 else audio
+    if start <= 0:
+        import whisper
+        return whisper.load_audio(path)
+
+    # Same output as whisper.load_audio, but ffmpeg seeks before decoding
+    import subprocess
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-ss", f"{start:.3f}", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+_whisper_model = None
+_whisper_lock = threading.Lock()
+
+
+def get_whisper_model():
+    """Load the Whisper model once per process and share it across requests."""
+    global _whisper_model
+    if _whisper_model is None:
+        with _whisper_lock:
+            if _whisper_model is None:
+                if Config.STT_BACKEND == "stub":
+                    _whisper_model = StubWhisperModel()
+                else:
+                    import whisper
+                    _whisper_model = whisper.load_model(WHISPER_MODEL_SIZE)
+    return _whisper_model
+
 # Redis queue key
 STT_QUEUE_KEY = "stt_batch_queue"
+STT_LOCK_TIMEOUT = 180  # a 2-minute answer on CPU can take a while
 
 def queue_audio_for_transcription(audio_bytes, ttl=3600):
     """
@@ -34,39 +122,74 @@ def queue_audio_for_transcription(audio_bytes, ttl=3600):
     return key, None  # Not ready yet
 
 
+def _record_vad_stats(stats):
+    """Log and accumulate how much audio VAD kept away from Whisper."""
+    print(f"[VAD] clip {stats['original_s']:.1f}s -> {stats['speech_s']:.1f}s "
+          f"(saved {stats['saved_s']:.1f}s)")
+    try:
+        pipe = r.pipeline()
+        pipe.hincrby(VAD_METRICS_KEY, "clips", 1)
+        pipe.hincrbyfloat(VAD_METRICS_KEY, "original_seconds", stats["original_s"])
+        pipe.hincrbyfloat(VAD_METRICS_KEY, "seconds_saved", stats["saved_s"])
+        pipe.execute()
+    except Exception as e:
+        print(f"[VAD] Failed to record metrics: {e}")
+
+
+def transcribe_file(model, path):
+    """
+    Transcribe an audio file with an already-loaded Whisper model.
+    Silence is trimmed first and long answers are split into speech
+    segments that are transcribed separately and concatenated.
+    """
+    with timed("whisper", mode="file"):
+        text, stats = run_cpu_bound(_transcribe_file, model, path)
+    # Redis I/O stays on the calling greenlet, not the CPU thread
+    if stats:
+        _record_vad_stats(stats)
+    return text
+
+
+def _transcribe_file(model, path):
+    """CPU-only part of transcribe_file; returns (text, VAD stats or None)."""
+    if not VAD_ENABLED:
+        return model.transcribe(path).get("text", "").strip(), None
+
+    audio = load_audio(path)
+    segments, stats = split_speech(audio, split=VAD_SPLIT)
+
+    texts = [model.transcribe(seg).get("text", "").strip() for seg in segments]
+    return " ".join(t for t in texts if t), stats
+
+
 def transcribe_audio(audio_bytes, ttl=3600):
     """
     Synchronous STT (no batching) — fallback if no worker.
     """
     audio_hash = hashlib.md5(audio_bytes).hexdigest()
-    key = f"stt:{audio_hash}"
 
-    cached_text = r.get(key)
-    if cached_text:
-        return cached_text.decode()
+    def transcribe():
+        tmp_path = None
+        text = ""
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                tmp.write(audio_bytes)
+                tmp_path = tmp.name
 
-    tmp_path = None
-    text = ""
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
-
-        model = whisper.load_model(WHISPER_MODEL_SIZE)
-        result = model.transcribe(tmp_path)
-        text = result.get("text", "").strip()
+            text = external_call("stt", lambda: transcribe_file(get_whisper_model(), tmp_path))
 
-    except Exception as e:
-        print(f"[STT ERROR] Failed to transcribe: {e}")
+        except Exception as e:
+            print(f"[STT ERROR] Failed to transcribe: {e}")
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except OSError:
-                pass
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
 
-    if text:
-        r.setex(key, ttl, text.encode())
+        return text.encode()
 
-    return text
+    # Retries/double submits of the same clip wait on one transcription
+    result = single_flight(f"stt:{audio_hash}", transcribe, ttl, lock_timeout=STT_LOCK_TIMEOUT)
+    return result.decode() if result else ""
@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from utils.cache import r, track_session_keys, redis_lock
+from utils.stt import get_whisper_model, load_audio, STT_LOCK_TIMEOUT
+from utils.vad import detect_speech, SAMPLE_RATE, MIN_SILENCE_MS
+from utils.concurrency import run_cpu_bound
+from utils.metrics import timed
+from utils.recorder import external_call
+
+# Chunked answer ingest: the browser posts MediaRecorder chunks while the
+# candidate is still speaking. Finished phrases are transcribed as they
+# arrive, so on finish only the short tail after the last pause is left.
+# Each pass decodes only from the committed offset (minus a short overlap
+# so the codec has warmed up by the first pending sample), and passes for
+# the same answer are serialized by a Redis lock. Each pass's transcript is
+# an "stt" external call, so session recordings replay it without audio.
+STREAM_TTL = 3600
+DECODE_OVERLAP_S = 0.5
+
+
+def _stream_key(user_id, session_id, question_id):
+    return f"stream:{user_id}:{session_id}:{question_id}"
+
+
+def _decode(audio_bytes, start=0.0):
+    """Decode container bytes (webm/wav/...) from `start` seconds to 16 kHz mono float32."""
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp:
+            tmp.write(audio_bytes)
+            tmp_path = tmp.name
+        return load_audio(tmp_path, start=start)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _transcribe_pending(key, final=False):
+    """
+    Transcribe speech recorded since the last call.
+    Unless `final` is set, a phrase is only transcribed once it is followed by
+    a pause, since the candidate may still be speaking at the end of the buffer.
+    Returns (parts, audio_bytes). Callers hold the stream's lock.
+    """
+    audio_bytes = b"".join(r.lrange(f"{key}:chunks", 0, -1))
+    state = r.hgetall(key)
+    offset = int(state.get(b"offset", 0))
+    parts = json.loads(state.get(b"parts", b"[]"))
+
+    if not audio_bytes:
+        return parts, audio_bytes
+
+    # Only the audio after the committed offset is decoded
+    window_start = max(0, offset - int(DECODE_OVERLAP_S * SAMPLE_RATE))
+    try:
+        audio = _decode(audio_bytes, start=window_start / SAMPLE_RATE)
+    except Exception as e:
+        # A partial container can fail to decode; the next chunk will retry.
+        print(f"[STT STREAM] Decode failed for {key}: {e}")
+        if final:
+            raise
+        return parts, audio_bytes
+
+    pending = audio[offset - window_start:]
+    regions = detect_speech(pending)
+    if not final:
+        tail = int(SAMPLE_RATE * MIN_SILENCE_MS / 1000)
+        regions = [(s, e) for s, e in regions if e <= len(pending) - tail]
+
+    if regions:
+        segment = np.concatenate([pending[s:e] for s, e in regions])
+        with timed("whisper", mode="stream"):
+            text = run_cpu_bound(get_whisper_model().transcribe, segment).get("text", "").strip()
+        if text:
+            parts.append(text)
+        offset += regions[-1][1]
+
+    pipe = r.pipeline()
+    pipe.hset(key, mapping={"offset": offset, "parts": json.dumps(parts)})
+    pipe.expire(key, STREAM_TTL)
+    pipe.execute()
+    return parts, audio_bytes
+
+
+def append_audio_chunk(user_id, session_id, question_id, chunk):
+    """
+    Append a recorded chunk and transcribe any phrases it completes.
+    Returns the partial transcript so far.
+    """
+    key = _stream_key(user_id, session_id, question_id)
+    pipe = r.pipeline()
+    pipe.rpush(f"{key}:chunks", chunk)
+    pipe.expire(f"{key}:chunks", STREAM_TTL)
+    track_session_keys(pipe, user_id, session_id, [key, f"{key}:chunks"])
+    pipe.execute()
+
+    return external_call("stt", lambda: _transcribe_chunk(key))
+
+
+def _transcribe_chunk(key):
+    parts = None
+    # If another chunk is being transcribed, it (or finish) will pick this one up
+    with redis_lock(key, lock_timeout=STT_LOCK_TIMEOUT) as acquired:
+        if acquired:
+            try:
+                parts, _ = _transcribe_pending(key)
+            except Exception as e:
+                print(f"[STT STREAM] Incremental transcription failed: {e}")
+    if parts is None:
+        parts = json.loads(r.hget(key, "parts") or b"[]")
+    return " ".join(parts)
+
+
+def finish_audio_stream(user_id, session_id, question_id, chunk=None, ttl=3600):
+    """
+    Transcribe the remaining tail, cache the full transcript under the same
+    stt:{hash} key transcribe_audio uses, and drop the stream buffers.
+    """
+    key = _stream_key(user_id, session_id, question_id)
+    if chunk:
+        r.rpush(f"{key}:chunks", chunk)
+
+    try:
+        return external_call("stt", lambda: _finish_transcript(key, ttl))
+    except Exception as e:
+        print(f"[STT STREAM ERROR] Failed to finish {key}: {e}")
+        return ""
+
+
+def _finish_transcript(key, ttl):
+    # Wait for an in-flight chunk pass so its offset and parts are kept
+    with redis_lock(key, lock_timeout=STT_LOCK_TIMEOUT, wait_timeout=STT_LOCK_TIMEOUT):
+        try:
+            parts, audio_bytes = _transcribe_pending(key, final=True)
+            text = " ".join(parts).strip()
+            if text:
+                audio_hash = hashlib.md5(audio_bytes).hexdigest()
+                r.setex(f"stt:{audio_hash}", ttl, text.encode())
+            return text
+        finally:
+            r.delete(key, f"{key}:chunks")
@@ -4,7 +4,8 @@ import json
 import tempfile
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from utils.cache import r
+from utils.cache import r, single_flight
+from utils.stt import transcribe_file, STT_LOCK_TIMEOUT
 
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL", "base")
 model = whisper.load_model(WHISPER_MODEL_SIZE)
@@ -24,11 +25,13 @@ def process_entry(entry):
         with open(tmp_path, "wb") as f:
             f.write(audio_bytes)
 
-        result = model.transcribe(tmp_path)
-        text = result.get("text", "").strip()
-        if text:
-            r.setex(entry["key"], entry["ttl"], text.encode())
-        return entry["key"], text
+        result = single_flight(
+            entry["key"],
+            lambda: transcribe_file(model, tmp_path).encode(),
+            entry["ttl"],
+            lock_timeout=STT_LOCK_TIMEOUT
+        )
+        return entry["key"], result.decode() if result else None
 
     except Exception as e:
         print(f"[STT WORKER ERROR] {e}")
@@ -1,10 +1,12 @@
-from gtts import gTTS
-import io
 import hashlib
-from utils.cache import r
+from utils.cache import r, single_flight
+from utils.tts_backends import get_tts_backend
+from utils.metrics import timed
+from utils.recorder import external_call
 import json
 
 TTS_QUEUE_KEY = "tts_batch_queue"
+TTS_LOCK_TIMEOUT = 30  # seconds before a stuck synthesis lock is considered stale
 
 def queue_tts(question_id, text, ttl=86400):
     """
@@ -22,24 +24,30 @@ def queue_tts(question_id, text, ttl=86400):
     return key
 
 
+def get_cached_tts(question_id):
+    """Return cached audio bytes for a question, or None if not generated/expired."""
+    return r.get(f"tts:{question_id}")
+
+
+def audio_content_type(audio_bytes):
+    """Sniff the container so cached audio is served correctly whichever backend made it."""
+    if audio_bytes[:4] == b"RIFF":
+        return "audio/wav"
+    return "audio/mpeg"
+
+
 def get_tts(question_id, text, ttl=86400):
     """
     Synchronous TTS generation (fallback).
     """
-    key = f"tts:{question_id}"
-    cached_audio = r.get(key)
-    if cached_audio:
-        return cached_audio
-
-    try:
-        safe_text = text.strip().replace("\n", " ")
-        tts = gTTS(text=safe_text, lang="en")
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        audio_bytes = buf.getvalue()
-    except Exception as e:
-        print(f"[TTS ERROR] {e}")
-        return b""
-
-    r.setex(key, ttl, audio_bytes)
-    return audio_bytes
+    def synthesize():
+        try:
+            backend = get_tts_backend()
+            with timed("tts", backend=backend.name):
+                return external_call("tts", lambda: backend.synthesize(text))
+        except Exception as e:
+            print(f"[TTS ERROR] {e}")
+            return b""
+
+    # Concurrent requests for the same question share one synthesis
+    return single_flight(f"tts:{question_id}", synthesize, ttl, lock_timeout=TTS_LOCK_TIMEOUT)
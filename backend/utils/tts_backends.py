@@ -0,0 +1,130 @@
+import io
+import os
+import math
+import wave
+import struct
+import hashlib
+import tempfile
+import threading
+from config import Config
+
+
+# ===== Backend Interface =====
+class TTSBackend:
+    """Turns question text into audio bytes. Subclasses set content_type."""
+    name = "base"
+    content_type = "application/octet-stream"
+
+    def synthesize(self, text):
+        raise NotImplementedError
+
+
+def normalize_text(text):
+    return (text or "").strip().replace("\n", " ")
+
+
+# ===== gTTS (remote, MP3) =====
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    content_type = "audio/mpeg"
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+
+    def synthesize(self, text):
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=normalize_text(text), lang=self.lang).write_to_fp(buf)
+        return buf.getvalue()
+
+
+# ===== pyttsx3 (local CPU via espeak/SAPI/NSSpeech, WAV) =====
+class LocalTTSBackend(TTSBackend):
+    name = "local"
+    content_type = "audio/wav"
+
+    def __init__(self, rate=None, voice=None):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+        if rate:
+            self.engine.setProperty("rate", rate)
+        if voice:
+            self.engine.setProperty("voice", voice)
+        # The engine has a single event loop, so synthesis is serialized
+        self._lock = threading.Lock()
+
+    def synthesize(self, text):
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                tmp_path = tmp.name
+            with self._lock:
+                self.engine.save_to_file(normalize_text(text), tmp_path)
+                self.engine.runAndWait()
+            with open(tmp_path, "rb") as f:
+                return f.read()
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+# ===== Deterministic stub (tests / benchmarks, WAV) =====
+class StubTTSBackend(TTSBackend):
+    """
+    Emits a short tone whose pitch and length are derived from the text,
+    so the same question always yields identical bytes with no I/O.
+    """
+    name = "stub"
+    content_type = "audio/wav"
+
+    SAMPLE_RATE = 8000
+
+    def __init__(self, ms_per_word=60):
+        self.ms_per_word = ms_per_word
+
+    def synthesize(self, text):
+        text = normalize_text(text)
+        digest = hashlib.md5(text.encode()).digest()
+        freq = 200 + digest[0] * 2
+        n_samples = self.SAMPLE_RATE * max(1, len(text.split())) * self.ms_per_word // 1000
+
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.SAMPLE_RATE)
+            w.writeframes(b"".join(
+                struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * i / self.SAMPLE_RATE)))
+                for i in range(n_samples)
+            ))
+        return buf.getvalue()
+
+
+# ===== Factory =====
+TTS_BACKENDS = {
+    "gtts": GTTSBackend,
+    "local": LocalTTSBackend,
+    "stub": StubTTSBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_tts_backend():
+    """Return the process-wide backend selected by Config.TTS_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = Config.TTS_BACKEND.lower()
+                if name not in TTS_BACKENDS:
+                    raise ValueError(f"Unknown TTS_BACKEND '{name}', expected one of {sorted(TTS_BACKENDS)}")
+                _backend = TTS_BACKENDS[name]()
+                print(f"[TTS] Using '{name}' backend")
+    return _backend
@@ -1,35 +1,52 @@
-from gtts import gTTS
-import io
+import os
 import json
-from utils.cache import r
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.cache import r, single_flight
+from utils.tts_backends import get_tts_backend
 
 TTS_QUEUE_KEY = "tts_batch_queue"
+TTS_LOCK_TIMEOUT = 30
 
-print("[TTS WORKER] Started")
+MAX_WORKERS = int(os.getenv("TTS_WORKERS", 4))  # configurable parallel threads
+BATCH_SIZE = 5  # how many to fetch from Redis per loop
+
+backend = get_tts_backend()
+
+print(f"[TTS WORKER] Started with '{backend.name}' backend using {MAX_WORKERS} threads")
+
+def process_entry(entry):
+    """Synthesize one entry, sharing the work with any concurrent get_tts call"""
+    try:
+        audio_bytes = single_flight(
+            entry["key"],
+            lambda: backend.synthesize(entry["text"]),
+            entry["ttl"],
+            lock_timeout=TTS_LOCK_TIMEOUT
+        )
+        return entry["key"], bool(audio_bytes)
+    except Exception as e:
+        print(f"[TTS WORKER ERROR] {e}")
+        return entry["key"], False
 
 while True:
     batch = []
-    while len(batch) < 5:
+    while len(batch) < BATCH_SIZE:
         item = r.lpop(TTS_QUEUE_KEY)
         if not item:
             break
         batch.append(json.loads(item))
 
     if not batch:
-        import time
         time.sleep(1)
         continue
 
     print(f"[TTS WORKER] Processing batch of {len(batch)} items")
 
-    for entry in batch:
-        try:
-            safe_text = entry["text"].strip().replace("\n", " ")
-            tts = gTTS(text=safe_text, lang="en")
-            buf = io.BytesIO()
-            tts.write_to_fp(buf)
-            audio_bytes = buf.getvalue()
-
-            r.setex(entry["key"], entry["ttl"], audio_bytes)
-        except Exception as e:
-            print(f"[TTS WORKER ERROR] {e}")
+    # Process in parallel
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(process_entry, entry) for entry in batch]
+
+        for future in as_completed(futures):
+            key, ok = future.result()
+            print(f"[TTS WORKER] Completed {key}: {ok}")
@@ -0,0 +1,93 @@
+import os
+import numpy as np
+
+# whisper.load_audio always resamples to 16 kHz mono float32
+SAMPLE_RATE = 16000
+
+FRAME_MS = int(os.getenv("VAD_FRAME_MS", 30))
+ENERGY_RATIO = float(os.getenv("VAD_ENERGY_RATIO", 0.1))   # speech if RMS >= ratio * loud reference
+ENERGY_FLOOR = float(os.getenv("VAD_ENERGY_FLOOR", 0.005))  # absolute floor so hiss never counts as speech
+MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", 700))  # shorter pauses stay inside a segment
+PAD_MS = int(os.getenv("VAD_PAD_MS", 200))
+MAX_SEGMENT_S = float(os.getenv("VAD_MAX_SEGMENT_S", 30))   # Whisper decodes 30 s windows
+
+
+def _frame_rms(audio, frame_len):
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def detect_speech(audio, sr=SAMPLE_RATE):
+    """
+    Energy-based voice activity detection.
+    Returns a list of (start, end) sample offsets of speech regions,
+    with short pauses merged and each region padded by PAD_MS.
+    """
+    frame_len = max(1, int(sr * FRAME_MS / 1000))
+    rms = _frame_rms(audio, frame_len)
+    if rms.size == 0:
+        return []
+
+    # Reference is a high percentile rather than the max so a single click
+    # doesn't push the threshold above normal speech.
+    threshold = max(ENERGY_FLOOR, ENERGY_RATIO * float(np.percentile(rms, 95)))
+    voiced = np.flatnonzero(rms >= threshold)
+    if voiced.size == 0:
+        return []
+
+    max_gap = max(1, MIN_SILENCE_MS // FRAME_MS)
+    regions = []
+    start = prev = int(voiced[0])
+    for f in voiced[1:]:
+        f = int(f)
+        if f - prev > max_gap:
+            regions.append((start, prev + 1))
+            start = f
+        prev = f
+    regions.append((start, prev + 1))
+
+    pad = int(sr * PAD_MS / 1000)
+    return [
+        (max(0, s * frame_len - pad), min(len(audio), e * frame_len + pad))
+        for s, e in regions
+    ]
+
+
+def split_speech(audio, sr=SAMPLE_RATE, split=True):
+    """
+    Trim leading/trailing silence and, if `split` is set, drop long internal
+    pauses by cutting the clip into speech segments of at most MAX_SEGMENT_S.
+
+    Returns (segments, stats) where stats has original_s, speech_s and saved_s.
+    """
+    original_s = len(audio) / sr
+    regions = detect_speech(audio, sr)
+
+    if not regions:
+        return [], {"original_s": original_s, "speech_s": 0.0, "saved_s": original_s}
+
+    if not split:
+        s, e = regions[0][0], regions[-1][1]
+        segments = [audio[s:e]]
+    else:
+        # Pack neighbouring regions (minus the pauses between them) into
+        # segments so we don't pay per-call overhead for every short phrase.
+        max_len = int(sr * MAX_SEGMENT_S)
+        groups = []
+        for s, e in regions:
+            if groups and groups[-1][1] + (e - s) <= max_len:
+                groups[-1][0].append(audio[s:e])
+                groups[-1][1] += e - s
+            else:
+                groups.append([[audio[s:e]], e - s])
+        segments = [np.concatenate(parts) for parts, _ in groups]
+
+    speech_s = sum(len(seg) for seg in segments) / sr
+    return segments, {
+        "original_s": original_s,
+        "speech_s": speech_s,
+        "saved_s": max(0.0, original_s - speech_s)
+    }
@@ -0,0 +1,63 @@
+import os
+import time
+import numpy as np
+
+# ===== Preload & Warmup =====
+# preload() pulls model weights and indexes into memory; under gunicorn it
+# runs once in the master so forked workers share the pages copy-on-write.
+# warmup() runs one tiny inference through each model in the serving
+# process (first calls allocate thread pools and buffers), then flips the
+# readiness flag that /ready reports.
+PRELOAD_WHISPER = os.getenv("PRELOAD_WHISPER", "false").lower() == "true"
+
+_state = {"ready": False, "error": None, "warmup_ms": None}
+
+
+def preload():
+    """Load the embedding model, question bank index, script index and (optionally) Whisper."""
+    start = time.perf_counter()
+    from utils.embeddings import get_embedding_model
+    from utils.faiss_index import get_question_index
+    from utils.script_detect import get_script_index
+
+    get_embedding_model()
+    _, question_data = get_question_index()
+    get_script_index()
+    if PRELOAD_WHISPER:
+        from utils.stt import get_whisper_model
+        get_whisper_model()
+
+    loaded = len(question_data)
+    print(f"[WARMUP] Preloaded models and {loaded} bank questions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def warmup():
+    """Encode, search and (optionally) transcribe once, then mark the process ready."""
+    start = time.perf_counter()
+    try:
+        from utils.embeddings import encode
+        from utils.faiss_index import get_question_index
+        from utils.script_detect import detect_scripted_answer
+
+        vec = encode(["warmup"])
+        question_index, _ = get_question_index()
+        if question_index is not None:
+            question_index.search(vec, 1)
+        detect_scripted_answer("warmup answer text")
+
+        if PRELOAD_WHISPER:
+            from utils.stt import get_whisper_model
+            get_whisper_model().transcribe(np.zeros(16000, dtype=np.float32))
+    except Exception as e:
+        _state["error"] = str(e)
+        print(f"[WARMUP ERROR] {e}")
+        return False
+
+    _state.update(ready=True, error=None, warmup_ms=round((time.perf_counter() - start) * 1000, 1))
+    print(f"[WARMUP] pid {os.getpid()} ready in {_state['warmup_ms']} ms")
+    return True
+
+
+def readiness():
+    """Return a copy of the readiness state: ready, error, warmup_ms."""
+    return dict(_state)
@@ -10,12 +10,12 @@ import { useToast } from "@/hooks/use-toast"
 import { QuestionCard } from "@/components/question-card"
 import { AnswerRecorder } from "@/components/answer-recorder"
 import { EvaluationCard } from "@/components/evaluation-card"
-import { apiCall } from "@/lib/api"
+import { apiCall, API_BASE_URL } from "@/lib/api"
 
 interface Question {
   question_id: string
   question: string
-  audio: string
+  audio_url: string
   sample_answer: string
 }
 
@@ -115,7 +115,7 @@ export default function InterviewPage() {
         const question: Question = {
           question_id: data.question_id,
           question: data.question,
-          audio: data.audio,
+          audio_url: data.audio_url,
           sample_answer: data.sample_answer,
         }
 
@@ -124,7 +124,7 @@ export default function InterviewPage() {
         setQuestionCount((prev) => prev + 1)
 
         setTimeout(() => {
-          playQuestionAudio(question.audio)
+          playQuestionAudio(question.audio_url)
         }, 500)
       } else {
         throw new Error("Failed to get question")
@@ -141,17 +141,12 @@ export default function InterviewPage() {
     }
   }
 
-  const playQuestionAudio = async (audioHex: string) => {
+  const playQuestionAudio = async (audioUrl: string) => {
     try {
       setIsPlayingAudio(true)
 
-      // Convert hex to audio blob
-      const audioBytes = new Uint8Array(audioHex.match(/.{1,2}/g)!.map((byte) => Number.parseInt(byte, 16)))
-      const audioBlob = new Blob([audioBytes], { type: "audio/wav" })
-      const audioUrl = URL.createObjectURL(audioBlob)
-
       if (audioRef.current) {
-        audioRef.current.src = audioUrl
+        audioRef.current.src = `${API_BASE_URL}${audioUrl}`
         audioRef.current.onended = () => {
           setIsPlayingAudio(false)
           setTimeout(() => {
@@ -9,7 +9,7 @@ import { MessageCircle } from "lucide-react"
 interface Question {
   question_id: string
   question: string
-  audio: string
+  audio_url: string
   sample_answer: string
 }
 
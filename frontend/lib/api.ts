@@ -1,4 +1,4 @@
-const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:5000"
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:5000"
 
 interface ApiOptions {
   method?: "GET" | "POST" | "PUT" | "DELETE"
@@ -115,6 +115,9 @@ export async function uploadFile(
   })
 }
 
+// The backend reports a resume job as failed after 5 minutes without progress
+const MAX_RESUME_POLLS = 360
+
 export async function uploadResume(file: File): Promise<any> {
   const token = localStorage.getItem("token")
   if (!token || token === "null" || token === "undefined") {
@@ -154,5 +157,27 @@ export async function uploadResume(file: File): Promise<any> {
     throw new Error(errorMessage)
   }
 
-  return await res.json()
+  // Parsing and indexing run in the background; wait for the job to finish
+  let job = await res.json()
+  let polls = 0
+  while (job.status === "queued" || job.status === "parsing" || job.status === "indexing") {
+    if (++polls > MAX_RESUME_POLLS) {
+      throw new Error("Resume processing is taking too long. Please try again.")
+    }
+    await new Promise((resolve) => setTimeout(resolve, 1000))
+    const statusRes = await fetch(`${API_BASE_URL}${job.status_url ?? `/api/interview/upload_resume/${job.job_id}`}`, {
+      headers: {
+        Authorization: `Bearer ${cleanToken}`,
+      },
+    })
+    if (!statusRes.ok) {
+      throw new Error(`Resume processing status failed: ${statusRes.status}`)
+    }
+    job = await statusRes.json()
+  }
+  if (job.status !== "done") {
+    throw new Error(job.error || `Resume processing ${job.status}`)
+  }
+
+  return job
 }